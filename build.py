@@ -6,7 +6,12 @@ StructModel build script.
 # Imports
 #
 
-from pybuilder.core import init, use_plugin, Author
+import os
+import subprocess
+import sys
+
+from pybuilder.core import init, task, use_plugin, Author
+from pybuilder.errors import BuildFailedException
 
 
 #
@@ -46,6 +51,27 @@ license = open('LICENSE').read().replace('\n', ' ')
 default_task = ( 'install_dependencies', 'analyze', 'publish' )
 
 
+@task('benchmark', description = 'Runs the benchmark suite against the baseline')
+def benchmark(project, logger):
+    output = project.expand_path('$dir_reports/benchmark.json')
+    if not os.path.exists(os.path.dirname(output)):
+        os.makedirs(os.path.dirname(output))
+    command = [
+        sys.executable, project.expand_path('$dir_source_benchmark_python/suite.py'),
+        '--output', output,
+        '--baseline', project.expand_path('$benchmark_baseline'),
+        '--threshold', str(project.get_property('benchmark_threshold'))
+    ]
+    if str(project.get_property('benchmark_save_baseline')).lower() == 'true':
+        command.append('--save-baseline')
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = project.expand_path('$dir_source_main_python')
+    logger.info('Running benchmarks, results in %s', output)
+    if subprocess.call(command, env = environment):
+        raise BuildFailedException('Benchmark regressions beyond %s' %
+            project.get_property('benchmark_threshold'))
+
+
 #
 # Initialization
 #
@@ -66,6 +92,10 @@ def initialize(project):
     project.set_property('dir_dist_scripts', 'bin')
     project.set_property('dir_source_unittest_python', 'tests/unit')
     project.set_property('dir_source_integrationtest_python', 'tests/integration')
+    project.set_property('dir_source_benchmark_python', 'tests/bench')
+    project.set_property('benchmark_baseline', '$dir_source_benchmark_python/baseline.json')
+    project.set_property('benchmark_threshold', 0.1)
+    project.set_property('benchmark_save_baseline', False)
     project.set_property('distutils_classifiers', [])
     project.set_property('distutils_commands', [])
 
@@ -75,5 +105,6 @@ def initialize(project):
     #
 
     project.build_depends_on('mockito')
+    project.build_depends_on('trollius')
     project.depends_on_requirements('requirements.txt')
 
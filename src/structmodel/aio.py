@@ -0,0 +1,94 @@
+#
+# Copyright
+#
+
+
+import collections
+
+from structmodel.exceptions import *
+
+
+def import_trollius():
+  try:
+    import trollius
+  except ImportError:
+    raise UnexpectedError('asynchronous streams require trollius')
+  return trollius
+
+
+class LineBuffer(object):
+
+  def __init__(self):
+    self.tail = ''
+
+  def feed(self, data):
+    lines = (self.tail + data).split('\n') if self.tail else data.split('\n')
+    self.tail = lines.pop()
+    return lines
+
+  def close(self):
+    _ = self.tail
+    self.tail = ''
+    return [_] if _ else []
+
+
+class JsonlStream(object):
+
+  def __init__(self, struct_cls, reader, parse, batch_size = 1000,
+    chunk_size = 65536, executor = None, offload_size = 0, errors = None,
+      loop = None):
+    self.struct_cls = struct_cls
+    self.reader = reader
+    self.parse = parse
+    self.batch_size = batch_size
+    self.chunk_size = chunk_size
+    self.executor = executor
+    self.offload_size = offload_size
+    self.errors = errors
+    self.loop = loop
+    self.buffer = LineBuffer()
+    self.lines = []
+    self.ready = collections.deque()
+    self.offset = 0
+    self.eof = False
+
+  def fill(self):
+    trollius = import_trollius()
+    while len(self.lines) < self.batch_size and not self.eof:
+      data = yield trollius.From(self.reader.read(self.chunk_size))
+      if data:
+        self.lines.extend(self.buffer.feed(data))
+      else:
+        self.lines.extend(self.buffer.close())
+        self.eof = True
+
+  def next_batch(self):
+    trollius = import_trollius()
+    yield trollius.From(self.fill())
+    if not self.lines:
+      raise trollius.Return(None)
+    lines = self.lines[:self.batch_size]
+    del self.lines[:self.batch_size]
+    offset = self.offset
+    self.offset += len(lines)
+    if self.executor is not None and len(lines) >= self.offload_size:
+      loop = self.loop if self.loop else trollius.get_event_loop()
+      structs, failures = yield trollius.From(loop.run_in_executor(
+        self.executor, self.parse, self.struct_cls, offset, lines))
+    else:
+      structs, failures = self.parse(self.struct_cls, offset, lines)
+      yield trollius.From(trollius.sleep(0, loop = self.loop))
+    if failures:
+      if self.errors is None:
+        raise RowProcessingError(*failures[0])
+      self.errors.extend(failures)
+    raise trollius.Return([_ for _ in structs if _ is not None])
+
+  def next_struct(self):
+    trollius = import_trollius()
+    while not self.ready:
+      batch = yield trollius.From(self.next_batch())
+      if batch is None:
+        raise trollius.Return(None)
+      self.ready.extend(batch)
+    raise trollius.Return(self.ready.popleft())
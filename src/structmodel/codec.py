@@ -0,0 +1,499 @@
+#
+# Copyright
+#
+
+
+import binascii
+import codecs
+import datetime
+import hashlib
+import json
+import struct
+
+from structmodel.compiler import Source
+from structmodel.exceptions import InvalidValueError, UnexpectedError
+from structmodel.types import AbstractStruct, CustomList, DataType, \
+  FixedOffset, ListType
+
+
+BOOL = struct.Struct('<?')
+INT = struct.Struct('<q')
+FLOAT = struct.Struct('<d')
+SIZE = struct.Struct('<I')
+DATE = struct.Struct('<i')
+CLOCK = struct.Struct('<qh')
+
+MASKS = {
+  1: struct.Struct('<B'),
+  2: struct.Struct('<H'),
+  4: struct.Struct('<I'),
+  8: struct.Struct('<Q')
+}
+
+FORMATS = {
+  'bool': ('?', 1),
+  'int': ('q', 8),
+  'float': ('d', 8)
+}
+
+INT_MIN = -1 << 63
+INT_MAX = (1 << 63) - 1
+
+NAIVE = -32768
+
+MICROS_PER_DAY = 86400000000
+
+utf_8_decode = codecs.utf_8_decode
+
+
+def kind_of(attr_type):
+  if attr_type is bool:
+    return 'bool'
+  if attr_type is int:
+    return 'int'
+  if attr_type is long:
+    return 'long'
+  if attr_type is float:
+    return 'float'
+  if attr_type is str:
+    return 'str'
+  if attr_type is datetime.date:
+    return 'date'
+  if attr_type is datetime.time:
+    return 'time'
+  if attr_type is datetime.datetime:
+    return 'datetime'
+  if attr_type is list:
+    return 'list'
+  if isinstance(attr_type, type) and issubclass(attr_type, AbstractStruct) \
+    and getattr(attr_type, '__overlay__', None):
+    return 'struct'
+  return 'json'
+
+
+def names_of(overlay):
+  return sorted(name for name in overlay.attrs \
+    if not name.startswith('_') and name not in overlay.implicit)
+
+
+def schema_of(overlay, seen):
+  if overlay.name in seen:
+    return overlay.name
+  seen = seen.union((overlay.name,))
+  return (overlay.name, bool(overlay.opts.open), [(name,
+    descriptor_of(overlay.attrs[name], seen)) for name in names_of(overlay)])
+
+
+def descriptor_of(opts, seen):
+  kind = kind_of(opts.type)
+  if kind == 'struct':
+    return schema_of(opts.type.__overlay__, seen)
+  if kind == 'list':
+    return (kind, descriptor_of(ListType.item_options(opts), seen))
+  return kind
+
+
+def fingerprint_of(overlay):
+  return hashlib.sha1(repr(schema_of(overlay, frozenset()))).digest()[:8]
+
+
+def mask_width(bits):
+  width = max(1, (bits + 7) // 8)
+  for _ in (1, 2, 4, 8):
+    if width <= _:
+      return _
+  return width
+
+
+def pack_mask(mask, width):
+  return binascii.unhexlify('%0*x' % (width * 2, mask))
+
+
+def check_bounds(buf, end):
+  if end > len(buf):
+    raise struct.error('buffer too short')
+
+
+def unpack_mask(buf, offset, width):
+  check_bounds(buf, offset + width)
+  return (int(binascii.hexlify(buf[offset:offset + width]), 16),)
+
+
+def offset_of(value):
+  _ = value.utcoffset()
+  return NAIVE if _ is None else (_.days * 86400 + _.seconds) // 60
+
+
+def zone_of(minutes):
+  return None if minutes == NAIVE else FixedOffset.of(minutes)
+
+
+def micros_of_time(value):
+  return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + \
+    value.microsecond
+
+
+def micros_of_datetime(value):
+  return (value.toordinal() * 86400 + (value.hour * 60 + value.minute) * 60 + \
+    value.second) * 1000000 + value.microsecond
+
+
+def time_of(micros, minutes):
+  seconds, micros = divmod(micros, 1000000)
+  _, seconds = divmod(seconds, 60)
+  hours, _ = divmod(_, 60)
+  return datetime.time(hours, _, seconds, micros, zone_of(minutes))
+
+
+def datetime_of(micros, minutes):
+  days, micros = divmod(micros, MICROS_PER_DAY)
+  seconds, micros = divmod(micros, 1000000)
+  _, seconds = divmod(seconds, 60)
+  hours, _ = divmod(_, 60)
+  date = datetime.date.fromordinal(days)
+  return datetime.datetime(date.year, date.month, date.day, hours, _,
+    seconds, micros, zone_of(minutes))
+
+
+def pack_bool(value, parts):
+  parts.append('\x01' if value else '\x00')
+
+
+def pack_int(value, parts):
+  parts.append(INT.pack(value))
+
+
+def pack_long(value, parts):
+  value = str(value)
+  parts.append(SIZE.pack(len(value)))
+  parts.append(value)
+
+
+def pack_float(value, parts):
+  parts.append(FLOAT.pack(value))
+
+
+def pack_str(value, parts):
+  value = value.encode('utf-8')
+  parts.append(SIZE.pack(len(value)))
+  parts.append(value)
+
+
+def pack_date(value, parts):
+  parts.append(DATE.pack(value.toordinal()))
+
+
+def pack_time(value, parts):
+  parts.append(CLOCK.pack(micros_of_time(value), offset_of(value)))
+
+
+def pack_datetime(value, parts):
+  parts.append(CLOCK.pack(micros_of_datetime(value), offset_of(value)))
+
+
+def pack_json(value, parts):
+  from structmodel.model import jsonable
+  pack_str(json.dumps(jsonable(value), separators = (',', ':')), parts)
+
+
+def pack_list(value, parts, pack_item, item_format):
+  append = parts.append
+  count = len(value)
+  append(SIZE.pack(count))
+  if item_format and None not in value:
+    append('\x00' * ((count + 7) // 8))
+    append(struct.pack('<%d%s' % (count, item_format[0]), *value))
+    return
+  index = len(parts)
+  append(None)
+  nones = bytearray((count + 7) // 8)
+  for i, item in enumerate(value):
+    if item is None:
+      nones[i >> 3] |= 1 << (i & 7)
+    else:
+      pack_item(item, parts)
+  parts[index] = str(nones)
+
+
+def pack_extras(struct, names):
+  extras = {k: v for k, v in struct.__dict__.iteritems() \
+    if k not in names and not k.startswith('_')}
+  if not extras:
+    return ''
+  from structmodel.model import jsonable
+  return json.dumps(jsonable(extras), separators = (',', ':'))
+
+
+def unpack_bool(buf, offset):
+  return BOOL.unpack_from(buf, offset)[0], offset + 1
+
+
+def unpack_int(buf, offset):
+  return INT.unpack_from(buf, offset)[0], offset + 8
+
+
+def unpack_long(buf, offset):
+  size, = SIZE.unpack_from(buf, offset)
+  offset += 4
+  check_bounds(buf, offset + size)
+  return long(buf[offset:offset + size].tobytes()), offset + size
+
+
+def unpack_float(buf, offset):
+  return FLOAT.unpack_from(buf, offset)[0], offset + 8
+
+
+def unpack_str(buf, offset):
+  size, = SIZE.unpack_from(buf, offset)
+  offset += 4
+  return utf_8_decode(buf[offset:offset + size])[0], offset + size
+
+
+def unpack_date(buf, offset):
+  return datetime.date.fromordinal(
+    DATE.unpack_from(buf, offset)[0]), offset + 4
+
+
+def unpack_time(buf, offset):
+  return time_of(*CLOCK.unpack_from(buf, offset)), offset + 10
+
+
+def unpack_datetime(buf, offset):
+  return datetime_of(*CLOCK.unpack_from(buf, offset)), offset + 10
+
+
+def unpack_list(buf, offset, opts, unpack_item, item_format):
+  count, = SIZE.unpack_from(buf, offset)
+  offset += 4
+  width = (count + 7) // 8
+  check_bounds(buf, offset + width)
+  nones = bytearray(buf[offset:offset + width])
+  offset += width
+  value = CustomList(opts)
+  if item_format and not nones.strip('\x00'):
+    list.extend(value, struct.unpack_from(
+      '<%d%s' % (count, item_format[0]), buf, offset))
+    return value, offset + count * item_format[1]
+  items = []
+  append = items.append
+  for i in xrange(count):
+    if nones[i >> 3] & (1 << (i & 7)):
+      append(None)
+    else:
+      item, offset = unpack_item(buf, offset)
+      append(item)
+  list.extend(value, items)
+  return value, offset
+
+
+PACKERS = {
+  'bool': pack_bool,
+  'int': pack_int,
+  'long': pack_long,
+  'float': pack_float,
+  'str': pack_str,
+  'date': pack_date,
+  'time': pack_time,
+  'datetime': pack_datetime,
+  'json': pack_json
+}
+
+UNPACKERS = {
+  'bool': unpack_bool,
+  'int': unpack_int,
+  'long': unpack_long,
+  'float': unpack_float,
+  'str': unpack_str,
+  'date': unpack_date,
+  'time': unpack_time,
+  'datetime': unpack_datetime
+}
+
+
+def overflow_of(opts, value):
+  return InvalidValueError(opts.namespace, opts.name, 'int64', value)
+
+
+def packer_of(opts):
+  kind = kind_of(opts.type)
+  if kind == 'struct':
+    attr_type = opts.type
+    return lambda value, parts: \
+      attr_type.__overlay__.packer_of()(value, parts)
+  if kind == 'list':
+    item_opts = ListType.item_options(opts)
+    pack_item = packer_of(item_opts)
+    item_format = FORMATS.get(kind_of(item_opts.type), None)
+    def pack(value, parts):
+      try:
+        pack_list(value, parts, pack_item, item_format)
+      except struct.error:
+        for _ in value:
+          if isinstance(_, (int, long)) and not INT_MIN <= _ <= INT_MAX:
+            raise overflow_of(item_opts, _)
+        raise
+    return pack
+  if kind == 'int':
+    def pack(value, parts):
+      try:
+        parts.append(INT.pack(value))
+      except struct.error:
+        raise overflow_of(opts, value)
+    return pack
+  return PACKERS[kind]
+
+
+def unpacker_of(opts):
+  kind = kind_of(opts.type)
+  if kind == 'struct':
+    attr_type = opts.type
+    return lambda buf, offset: \
+      attr_type.__overlay__.unpacker_of()(buf, offset, attr_type)
+  if kind == 'list':
+    item_opts = ListType.item_options(opts)
+    unpack_item = unpacker_of(item_opts)
+    item_format = FORMATS.get(kind_of(item_opts.type), None)
+    return lambda buf, offset: \
+      unpack_list(buf, offset, opts, unpack_item, item_format)
+  if kind == 'json':
+    setter = DataType.setter_of(opts)
+    def unpack(buf, offset):
+      value, offset = unpack_str(buf, offset)
+      return setter(json.loads(value)), offset
+    return unpack
+  return UNPACKERS[kind]
+
+
+def compile_packer(overlay):
+  names = names_of(overlay)
+  width = mask_width(len(names) * 2)
+  source = Source('packer', 'struct', 'parts')
+  symbols = {
+    'missing': source.bind(object()),
+    'size': source.bind(SIZE.pack),
+    'int': source.bind(INT.pack),
+    'float': source.bind(FLOAT.pack),
+    'error': source.bind(struct.error),
+    'overflow': source.bind(overflow_of),
+    'mask': source.bind(MASKS[width].pack if width in MASKS else \
+      lambda mask: pack_mask(mask, width))
+  }
+  source.emit(
+    ('get = struct.get\n' if overlay.lazy else 'get = struct.__dict__.get\n') +
+    'append = parts.append\n'
+    'index = len(parts)\n'
+    'append(None)\n'
+    'mask = 0')
+  for i, name in enumerate(names):
+    attr_opts = overlay.attrs[name]
+    kind = kind_of(attr_opts.type)
+    symbols['name'] = source.bind(name)
+    symbols['present'] = 1 << (i * 2)
+    symbols['none'] = 3 << (i * 2)
+    source.emit(
+      'value = get(%(name)s, %(missing)s)\n'
+      'if value is None:\n'
+      '  mask |= %(none)d\n'
+      'elif value is not %(missing)s:\n'
+      '  mask |= %(present)d' % symbols)
+    if kind == 'bool':
+      source.emit('append(\'\\x01\' if value else \'\\x00\')', 1)
+    elif kind == 'int':
+      symbols['opts'] = source.bind(attr_opts)
+      source.emit(
+        'try:\n'
+        '  append(%(int)s(value))\n'
+        'except %(error)s:\n'
+        '  raise %(overflow)s(%(opts)s, value)' % symbols, 1)
+    elif kind == 'float':
+      source.emit('append(%(float)s(value))' % symbols, 1)
+    elif kind == 'str':
+      source.emit(
+        'value = value.encode(\'utf-8\')\n'
+        'append(%(size)s(len(value)))\n'
+        'append(value)' % symbols, 1)
+    else:
+      source.emit('%s(value, parts)' % source.bind(packer_of(attr_opts)), 1)
+  if overlay.opts.open:
+    source.emit(
+      'value = %s(struct, %s)\n'
+      'append(%s(len(value)))\n'
+      'append(value)' % (source.bind(pack_extras),
+        source.bind(frozenset(names)), symbols['size']))
+  source.emit('parts[index] = %(mask)s(mask)' % symbols)
+  return source.compile((overlay.name, 'packer'))
+
+
+def unpack_from(unpacker, buf, offset, struct_cls, name):
+  try:
+    value, offset = unpacker(buf, offset, struct_cls)
+  except struct.error:
+    offset = None
+  if offset is None or offset > len(buf):
+    raise UnexpectedError('truncated %s buffer' % name)
+  return value, offset
+
+
+def compile_unpacker(overlay):
+  names = names_of(overlay)
+  width = mask_width(len(names) * 2)
+  source = Source('unpacker', 'buf', 'offset', 'struct_cls')
+  symbols = {
+    'size': source.bind(SIZE.unpack_from),
+    'bool': source.bind(BOOL.unpack_from),
+    'int': source.bind(INT.unpack_from),
+    'float': source.bind(FLOAT.unpack_from),
+    'decode': source.bind(utf_8_decode),
+    'check': source.bind(check_bounds),
+    'mask': source.bind(MASKS[width].unpack_from if width in MASKS else \
+      lambda buf, offset: unpack_mask(buf, offset, width)),
+    'width': width
+  }
+  source.emit(
+    'mask, = %(mask)s(buf, offset)\n'
+    'offset += %(width)d\n'
+    'values = {}' % symbols)
+  for i, name in enumerate(names):
+    attr_opts = overlay.attrs[name]
+    kind = kind_of(attr_opts.type)
+    symbols['name'] = source.bind(name)
+    symbols['present'] = 1 << (i * 2)
+    symbols['none'] = 2 << (i * 2)
+    source.emit(
+      'if mask & %(none)d:\n'
+      '  values[%(name)s] = None\n'
+      'elif mask & %(present)d:' % symbols)
+    if kind == 'bool':
+      source.emit(
+        'values[%(name)s], = %(bool)s(buf, offset)\n'
+        'offset += 1' % symbols, 1)
+    elif kind in ('int', 'float'):
+      source.emit((
+        'values[%(name)s], = %(' + kind + ')s(buf, offset)\n'
+        'offset += 8') % symbols, 1)
+    elif kind == 'str':
+      source.emit(
+        'size, = %(size)s(buf, offset)\n'
+        'offset += 4\n'
+        'values[%(name)s] = %(decode)s(buf[offset:offset + size])[0]\n'
+        'offset += size' % symbols, 1)
+    else:
+      source.emit('values[%s], offset = %s(buf, offset)' % (
+        symbols['name'], source.bind(unpacker_of(attr_opts))), 1)
+  if overlay.opts.open:
+    symbols['loads'] = source.bind(json.loads)
+    source.emit(
+      'size, = %(size)s(buf, offset)\n'
+      'offset += 4\n'
+      'if size:\n'
+      '  %(check)s(buf, offset + size)\n'
+      '  values.update(%(loads)s(%(decode)s(buf[offset:offset + size])[0]))\n'
+      '  offset += size' % symbols)
+  source.emit(
+    'struct = struct_cls.__new__(struct_cls)\n'
+    'if getattr(struct_cls, \'__layout__\', None) is not None:\n'
+    '  struct.__setstate__(values)\n'
+    'else:\n'
+    '  object.__setattr__(struct, \'__dict__\', values)\n'
+    'return struct, offset')
+  return source.compile((overlay.name, 'unpacker'))
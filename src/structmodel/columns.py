@@ -0,0 +1,347 @@
+#
+# Copyright
+#
+
+
+import binascii
+import datetime
+import json
+import mmap
+import struct
+
+from structmodel import codec
+from structmodel.exceptions import *
+from structmodel.types import AbstractStruct
+
+
+MAGIC = 'SMCOLS01'
+
+HEADER = struct.Struct('<8sI')
+
+ABSENT = '\x00'
+PRESENT = '\x01'
+NONE = '\x02'
+
+FORMATS = {
+  'bool': ('?', 1),
+  'int': ('q', 8),
+  'float': ('d', 8),
+  'date': ('i', 4),
+  'time': ('q', 8),
+  'datetime': ('q', 8)
+}
+
+MISSING = object()
+
+
+def padding_of(size):
+  return -size % 8
+
+
+def fixed_value(kind, value):
+  if kind == 'date':
+    return value.toordinal()
+  if kind == 'time':
+    return codec.micros_of_time(value)
+  if kind == 'datetime':
+    return codec.micros_of_datetime(value)
+  return value
+
+
+class ColumnWriter(object):
+
+  def __init__(self, name, opts):
+    self.name = name
+    self.kind = codec.kind_of(opts.type)
+    self.opts = opts
+    self.status = bytearray()
+    self.values = []
+    self.zones = []
+    self.heap = []
+    self.offsets = [0]
+    self.size = 0
+    self.pack = None if self.kind in FORMATS else codec.packer_of(opts)
+
+  def append(self, value):
+    if value is MISSING or value is None:
+      self.status.append(NONE if value is None else ABSENT)
+      if self.kind in FORMATS:
+        self.values.append(0)
+        if self.kind in ('time', 'datetime'):
+          self.zones.append(codec.NAIVE)
+      else:
+        self.offsets.append(self.size)
+      return
+    self.status.append(PRESENT)
+    kind = self.kind
+    if kind in FORMATS:
+      self.values.append(fixed_value(kind, value))
+      if kind in ('time', 'datetime'):
+        self.zones.append(codec.offset_of(value))
+      return
+    if kind == 'str':
+      value = value.encode('utf-8')
+    else:
+      parts = []
+      self.pack(value, parts)
+      value = ''.join(parts)
+    self.heap.append(value)
+    self.size += len(value)
+    self.offsets.append(self.size)
+
+  def sections(self):
+    rows = len(self.status)
+    yield 'status', str(self.status)
+    if self.kind in FORMATS:
+      try:
+        values = struct.pack('<%d%s' % (rows, FORMATS[self.kind][0]),
+          *self.values)
+      except struct.error:
+        for _ in self.values:
+          if not codec.INT_MIN <= _ <= codec.INT_MAX:
+            raise codec.overflow_of(self.opts, _)
+        raise
+      yield 'values', values
+      if self.kind in ('time', 'datetime'):
+        yield 'zones', struct.pack('<%dh' % rows, *self.zones)
+    else:
+      yield 'offsets', struct.pack('<%dQ' % (rows + 1), *self.offsets)
+      yield 'heap', ''.join(self.heap)
+
+
+def write_columns(overlay, structs, fp):
+  names = codec.names_of(overlay)
+  writers = [ColumnWriter(name, overlay.attrs[name]) for name in names]
+  rows = 0
+  for _ in structs:
+    if not isinstance(_, AbstractStruct):
+      raise InvalidStructType(_.__class__)
+    get = _.get
+    for writer in writers:
+      writer.append(get(writer.name, MISSING))
+    rows += 1
+  columns = []
+  sections = []
+  position = 0
+  for writer in writers:
+    column = {'name': writer.name, 'kind': writer.kind}
+    for section, data in writer.sections():
+      column[section] = position
+      sections.append(data)
+      sections.append('\x00' * padding_of(len(data)))
+      position += len(data) + padding_of(len(data))
+    columns.append(column)
+  header = json.dumps({
+    'struct': overlay.name,
+    'fingerprint': binascii.hexlify(overlay.fingerprint()),
+    'rows': rows,
+    'columns': columns
+  }, sort_keys = True, separators = (',', ':'))
+  header += ' ' * padding_of(HEADER.size + len(header))
+  fp.write(HEADER.pack(MAGIC, len(header)))
+  fp.write(header)
+  for _ in sections:
+    fp.write(_)
+  return rows
+
+
+def fixed_reader(buf, column, base):
+  kind = column['kind']
+  status = base + column['status']
+  fmt, size = FORMATS[kind]
+  values = base + column['values']
+  unpack = struct.Struct('<' + fmt).unpack_from
+  if kind in ('bool', 'int', 'float'):
+    def read(index):
+      _ = buf[status + index]
+      if _ == PRESENT:
+        return unpack(buf, values + index * size)[0]
+      return None if _ == NONE else MISSING
+    return read
+  if kind == 'date':
+    def read(index):
+      _ = buf[status + index]
+      if _ == PRESENT:
+        return datetime.date.fromordinal(
+          unpack(buf, values + index * 4)[0])
+      return None if _ == NONE else MISSING
+    return read
+  zones = base + column['zones']
+  unpack_zone = struct.Struct('<h').unpack_from
+  convert = codec.time_of if kind == 'time' else codec.datetime_of
+  def read(index):
+    _ = buf[status + index]
+    if _ == PRESENT:
+      return convert(unpack(buf, values + index * 8)[0],
+        unpack_zone(buf, zones + index * 2)[0])
+    return None if _ == NONE else MISSING
+  return read
+
+
+def heap_reader(buf, column, base, opts):
+  status = base + column['status']
+  offsets = base + column['offsets']
+  heap = base + column['heap']
+  unpack = struct.Struct('<QQ').unpack_from
+  decode = codec.utf_8_decode
+  if column['kind'] == 'str':
+    def read(index):
+      _ = buf[status + index]
+      if _ == PRESENT:
+        start, end = unpack(buf, offsets + index * 8)
+        return decode(buf[heap + start:heap + end])[0]
+      return None if _ == NONE else MISSING
+    return read
+  unpack_value = codec.unpacker_of(opts)
+  def read(index):
+    _ = buf[status + index]
+    if _ == PRESENT:
+      start, end = unpack(buf, offsets + index * 8)
+      return unpack_value(memoryview(buf[heap + start:heap + end]), 0)[0]
+    return None if _ == NONE else MISSING
+  return read
+
+
+class RowView(AbstractStruct):
+
+  __slots__ = ('__store__', '__index__')
+
+  def __init__(self, store, index):
+    object.__setattr__(self, '__store__', store)
+    object.__setattr__(self, '__index__', index)
+
+  @property
+  def __dict__(self):
+    return dict(self.iteritems())
+
+  def __getitem__(self, key):
+    read = self.__store__.readers.get(key, None)
+    value = read(self.__index__) if read else MISSING
+    if value is MISSING:
+      raise KeyError(key)
+    return value
+
+  def __setitem__(self, key, value):
+    raise UnexpectedError('%s rows are read-only' % self.__store__.name)
+
+  def __delitem__(self, key):
+    raise UnexpectedError('%s rows are read-only' % self.__store__.name)
+
+  def __contains__(self, key):
+    read = self.__store__.readers.get(key, None)
+    return bool(read) and read(self.__index__) is not MISSING
+
+  def __iter__(self):
+    return (_[0] for _ in self.iteritems())
+
+  def __len__(self):
+    return sum(1 for _ in self.iteritems())
+
+  def get(self, key, default = None):
+    read = self.__store__.readers.get(key, None)
+    value = read(self.__index__) if read else MISSING
+    return default if value is MISSING else value
+
+  def iteritems(self):
+    index = self.__index__
+    for name, read in self.__store__.columns:
+      value = read(index)
+      if value is not MISSING:
+        yield name, value
+
+  def materialize(self):
+    return self.__store__.struct(self.__index__)
+
+  def validate(self, strict = False):
+    self.materialize().validate(strict)
+    return self
+
+  def copy(self, deep = False, cow = False):
+    return self.materialize()
+
+  def json(self):
+    return self.materialize().json()
+
+
+class ColumnStore(object):
+
+  def __init__(self, overlay, source, struct_cls = None):
+    self.struct_cls = struct_cls if struct_cls else overlay.struct_cls
+    self.name = overlay.name
+    self.fp = open(source, 'rb')
+    try:
+      self.buf = mmap.mmap(self.fp.fileno(), 0, access = mmap.ACCESS_READ)
+    except:
+      self.fp.close()
+      raise
+    try:
+      self.load(overlay)
+    except:
+      self.close()
+      raise
+
+  def load(self, overlay):
+    magic, size = HEADER.unpack_from(self.buf, 0)
+    if magic != MAGIC:
+      raise UnexpectedError('%s is not a column store' % self.fp.name)
+    header = json.loads(self.buf[HEADER.size:HEADER.size + size])
+    expected = binascii.hexlify(overlay.fingerprint())
+    if header['fingerprint'] != expected:
+      raise SchemaMismatchError(self.struct_cls, expected,
+        header['fingerprint'])
+    base = HEADER.size + size
+    self.rows = header['rows']
+    self.columns = []
+    for column in header['columns']:
+      if column['kind'] in FORMATS:
+        read = fixed_reader(self.buf, column, base)
+      else:
+        read = heap_reader(self.buf, column, base,
+          overlay.attrs[column['name']])
+      self.columns.append((column['name'], read))
+    self.readers = dict(self.columns)
+
+  def __len__(self):
+    return self.rows
+
+  def __getitem__(self, index):
+    if index < 0:
+      index += self.rows
+    if index < 0 or index >= self.rows:
+      raise IndexError(index)
+    return RowView(self, index)
+
+  def __iter__(self):
+    for _ in xrange(self.rows):
+      yield RowView(self, _)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def column(self, name):
+    read = self.readers[name]
+    return [None if _ is MISSING else _ for _ in (
+      read(index) for index in xrange(self.rows))]
+
+  def struct(self, index):
+    values = {}
+    for name, read in self.columns:
+      value = read(index)
+      if value is not MISSING:
+        values[name] = value
+    struct_cls = self.struct_cls
+    _ = struct_cls.__new__(struct_cls)
+    if getattr(struct_cls, '__layout__', None) is not None:
+      _.__setstate__(values)
+    else:
+      object.__setattr__(_, '__dict__', values)
+    return _
+
+  def close(self):
+    if self.buf is not None:
+      self.buf.close()
+      self.buf = None
+    self.fp.close()
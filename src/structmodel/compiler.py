@@ -0,0 +1,62 @@
+#
+# Copyright
+#
+
+
+class Source(object):
+
+  codes = {}
+  slots = {}
+
+  @classmethod
+  def release(cls, key):
+    text = cls.slots.pop(key, None)
+    if text is not None:
+      entry = cls.codes[text]
+      entry[1] -= 1
+      if not entry[1]:
+        del cls.codes[text]
+
+  def __init__(self, name, *args):
+    self.name = name
+    self.args = args
+    self.lines = []
+    self.symbols = {}
+    self.namespace = {}
+
+  def bind(self, value, prefix = 'c'):
+    _ = self.symbols.get(id(value), None)
+    if _:
+      return _
+    _ = '%s%d' % (prefix, len(self.namespace))
+    self.symbols[id(value)] = _
+    self.namespace[_] = value
+    return _
+
+  def emit(self, line, depth = 0):
+    for _ in line.split('\n'):
+      self.lines.append('  ' * (depth + 1) + _)
+    return self
+
+  def text(self):
+    return 'def %s(%s):\n%s\n' % (self.name, ', '.join(self.args),
+      '\n'.join(self.lines) if self.lines else '  pass')
+
+  def compile(self, key = None):
+    text = self.text()
+    codes = Source.codes
+    entry = codes.get(text, None)
+    if entry is None:
+      entry = [compile(text, '<%s>' % self.name, 'exec'), 0]
+    if key is not None:
+      slots = Source.slots
+      _ = slots.get(key, None)
+      if _ != text:
+        if _ is not None:
+          Source.release(key)
+        slots[key] = text
+        codes[text] = entry
+        entry[1] += 1
+    namespace = dict(self.namespace)
+    exec entry[0] in namespace
+    return namespace[self.name]
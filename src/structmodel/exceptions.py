@@ -3,6 +3,8 @@
 #
 
 
+import collections
+
 from structmodel.utils import qname
 
 
@@ -15,6 +17,18 @@ def stringify(ex):
   return '%s%s' % (ex.message if ex.message else '',
     ex.parameters if ex.parameters else '')
 
+def violation_of(path, ex):
+  return Violation(path, ex.__class__.__name__,
+    getattr(ex, 'parameters', None) or {'message': str(ex)})
+
+def restore(cls, state):
+  ex = cls.__new__(cls)
+  ex.__dict__.update(state)
+  return ex
+
+
+Violation = collections.namedtuple('Violation', ('path', 'code', 'params'))
+
 
 class ApplicationException(Exception):
 
@@ -25,6 +39,9 @@ class ApplicationException(Exception):
   def __str__(self):
     return stringify(self)
 
+  def __reduce__(self):
+    return (restore, (self.__class__, self.__dict__))
+
 
 class SystemException(Exception):
 
@@ -40,6 +57,9 @@ class SystemException(Exception):
     else:
       return stringify(self)
 
+  def __reduce__(self):
+    return (restore, (self.__class__, self.__dict__))
+
 
 class FrameworkException(Exception):
 
@@ -50,6 +70,9 @@ class FrameworkException(Exception):
   def __str__(self):
     return stringify(self)
 
+  def __reduce__(self):
+    return (restore, (self.__class__, self.__dict__))
+
 
 class ModelException(FrameworkException):
 
@@ -101,6 +124,20 @@ class MissingRequireAttributeError(ModelException):
       attribute = qname(namespace, name))
 
 
+class RowProcessingError(ModelException):
+
+  def __init__(self, row, reason):
+    super(RowProcessingError, self).__init__(
+      row = row, reason = reason)
+
+
+class SchemaMismatchError(ModelException):
+
+  def __init__(self, struct_type, expected, found):
+    super(SchemaMismatchError, self).__init__(
+      struct_type = struct_type, expected = expected, found = found)
+
+
 class UnrecognizedTypeError(TypeException):
 
   def __init__(self, namespace, name, type):
@@ -116,6 +153,13 @@ class IncompatibleTypeError(TypeException):
         expected_type = expected_type, found_type = found_type)
 
 
+class IncompatibleSourceError(TypeException):
+
+  def __init__(self, struct_type, found_type):
+    super(IncompatibleSourceError, self).__init__(
+      struct_type = struct_type, found_type = found_type)
+
+
 class NonIterableTypeError(TypeException):
 
   def __init__(self, namespace, name, found_type):
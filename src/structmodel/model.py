@@ -3,63 +3,598 @@
 #
 
 
+import binascii
 import collections
+import datetime
+import itertools
 import json
+import multiprocessing
+import operator
+import weakref
 
+from structmodel import aio, codec, columns, schema, stats
+from structmodel.compiler import Source
 from structmodel.exceptions import *
 from structmodel.options import StructOptions, AttributeOptions
-from structmodel.types import AbstractStruct, DataType, CustomList
+from structmodel.streams import ArrayReader, ArrayWriter, buffered, \
+  open_stream
+from structmodel.types import AbstractStruct, DataType, CustomList, \
+  DeferredList, ListType, ObjectType, ATOMIC_TYPES, copy_value, link_node, \
+  touch_parents, detach
+from structmodel.utils import qname
+
+
+UNSET = object()
+CLEAN = frozenset()
+
+
+def hidden_value(value):
+  return value
+
+
+def jsonable(x):
+  if x is None or isinstance(x, (basestring, int, long, float)):
+    return x
+  if isinstance(x, (list, tuple)):
+    return [jsonable(_) for _ in x]
+  if isinstance(x, dict):
+    return {k: jsonable(v) for k, v in x.iteritems()}
+  if isinstance(x, AbstractStruct):
+    return jsonable_struct(x)
+  if hasattr(x, '__dict__'):
+    return {k: jsonable(v) for k, v in x.__dict__.iteritems() \
+      if not k.startswith('_')}
+  if hasattr(x, 'isoformat'):
+    return x.isoformat()
+  return str(x)
+
+
+def jsonable_struct(x):
+  if x is None or x.__class__ is dict:
+    return x
+  _ = getattr(x.__class__, '__overlay__', None)
+  if not _:
+    try:
+      _ = Model.overlay_of(x.__class__)
+    except ModelException:
+      return {k: jsonable(v) for k, v in x.iteritems() \
+        if not k.startswith('_')}
+  return _.encoder_of()(x)
+
+
+def group_rows(rows):
+  if not rows:
+    return []
+  keys = tuple(rows[0])
+  if keys and set(map(len, rows)) == set([len(keys)]):
+    try:
+      map(operator.itemgetter(*keys), rows)
+      return [(keys, range(len(rows)))]
+    except KeyError:
+      pass
+  groups = collections.OrderedDict()
+  for i, keys in enumerate(map(frozenset, rows)):
+    _ = groups.get(keys, None)
+    if _ is None:
+      groups[keys] = _ = []
+    _.append(i)
+  return [(tuple(k), v) for k, v in groups.iteritems()]
+
+
+def restore_struct(struct_cls):
+  return struct_cls.__new__(struct_cls)
+
+
+def overrides_setitem(struct_cls):
+  _ = struct_cls.__setitem__.__func__
+  return _ is not struct_setitem and _ is not compact_setitem
+
+
+def compact_class_of(struct_cls, overlay):
+  if issubclass(struct_cls, CompactStruct):
+    return struct_cls
+  return type(struct_cls)(struct_cls.__name__, (CompactStruct, struct_cls), {
+    '__module__': struct_cls.__module__,
+    '__slots__': ('__values__',),
+    '__dict__': CompactStruct.__dict__['__dict__'],
+    '__layout__': overlay.layout,
+    '__names__': overlay.names
+  })
+
+
+def materializer_of(attr_opts):
+  return lambda x: ObjectType.value_of(x, attr_opts)
+
+
+class LazyAttribute(object):
+
+  def __init__(self, name):
+    self.name = name
+
+  def __get__(self, struct, struct_cls = None):
+    if struct is None:
+      return self
+    return struct.__getitem__(self.name)
+
+  def __set__(self, struct, value):
+    struct.__setitem__(self.name, value)
+
+  def __delete__(self, struct):
+    struct.__delitem__(self.name)
+
+
+def store_value(struct, key, value):
+  values = struct.__values__
+  _ = struct.__layout__.get(key, None)
+  if _ is None:
+    _ = struct.__overlay__.slot_of(key)
+  if _ >= len(values):
+    values.extend([UNSET] * (_ + 1 - len(values)))
+  values[_] = value
+
+
+def copy_values(source, clone, keys, values, deep, cow):
+  values = list(values)
+  borrowed = source.__shared__
+  if not deep and not cow and not borrowed:
+    return values
+  shared = []
+  for i, key in enumerate(itertools.islice(keys, len(values))):
+    value = values[i]
+    if value is UNSET or value.__class__ in ATOMIC_TYPES:
+      continue
+    if key.startswith('_') or \
+      not isinstance(value, (AbstractStruct, CustomList)):
+      if deep or cow:
+        values[i] = copy_value(value, cow)
+    elif cow or not deep and borrowed and key in borrowed:
+      link_node(value, source, key)
+      link_node(value, clone, key)
+      shared.append(key)
+    elif deep:
+      values[i] = copy_value(value)
+  if shared:
+    _ = source.__overlay__
+    (_ if _ else Model.overlay_of(source.__class__)).share()
+    set_shared(clone, frozenset(shared))
+  return values
+
+
+def unshare_value(struct, key, value):
+  set_shared(struct, struct.__shared__.difference((key,)) or None)
+  value = value.copy(cow = True)
+  link_node(value, struct, key)
+  return value
+
+
+def discard_shared(struct, key):
+  shared = struct.__shared__
+  if key in shared:
+    set_shared(struct, shared.difference((key,)) or None)
+
+
+def validate_rows(struct_cls, offset, rows):
+  errors = []
+  structs = Model.build_many(struct_cls, rows, errors)
+  failures = dict(errors)
+  for i, struct in enumerate(structs):
+    if struct is not None:
+      try:
+        struct.validate()
+      except Exception, e:
+        structs[i] = None
+        failures[i] = e
+  return structs, [(offset + i, failures[i]) for i in sorted(failures)]
+
+
+def check_struct(struct, errors, path):
+  _ = getattr(struct.__class__, '__overlay__', None)
+  if not _:
+    try:
+      _ = Model.overlay_of(struct.__class__)
+    except ModelException:
+      try:
+        struct.validate()
+      except Exception, e:
+        errors.append(violation_of(path[:-1], e))
+      return
+  _.checker_of()(struct, errors, path)
+
+
+def validate_chunk(args):
+  return validate_rows(*args)
+
+
+def chunks_of(rows, chunk_size):
+  rows = iter(rows)
+  offset = 0
+  while True:
+    _ = list(itertools.islice(rows, chunk_size))
+    if not _:
+      return
+    yield offset, _
+    offset += len(_)
+
+
+def parse_lines(struct_cls, offset, lines):
+  rows = []
+  indices = []
+  failures = []
+  for i, line in enumerate(lines, offset):
+    if not line.strip():
+      continue
+    try:
+      _ = json.loads(line)
+      if not isinstance(_, dict):
+        raise IncompatibleSourceError(struct_cls, type(_))
+    except Exception, e:
+      failures.append((i, e))
+      continue
+    rows.append(_)
+    indices.append(i)
+  structs, _ = validate_rows(struct_cls, 0, rows)
+  failures.extend((indices[i], e) for i, e in _)
+  return structs, sorted(failures)
+
+
+def encode_lines(structs, errors):
+  encoder = json.JSONEncoder(separators = (',', ':'))
+  encoders = {}
+  for i, struct in enumerate(structs):
+    try:
+      _ = encoders.get(struct.__class__, None)
+      if not _:
+        _ = Model.overlay_of(struct.__class__).encoder_of()
+        encoders[struct.__class__] = _
+      _ = encoder.encode(_(struct))
+    except Exception, e:
+      if errors is None:
+        raise RowProcessingError(i, e)
+      errors.append((i, e))
+      continue
+    yield _
+    yield '\n'
+
+
+def decode_struct(x, struct_cls):
+  if not isinstance(x, dict):
+    return x
+  _ = getattr(struct_cls, '__overlay__', None)
+  if not _:
+    return x
+  return _.decoder_of()(x, struct_cls)
+
+
+def decode_structs(x, item_type):
+  _ = getattr(item_type, '__overlay__', None)
+  if not _ or not isinstance(x, list):
+    return x
+  decoder = _.decoder_of()
+  for i, item in enumerate(x):
+    if isinstance(item, dict):
+      x[i] = decoder(item, item_type)
+  return x
+
+
+def decoder_of(attr_type, item_type = None):
+  if attr_type == list:
+    if isinstance(item_type, type) and \
+      issubclass(item_type, AbstractStruct):
+      return lambda x: decode_structs(x, item_type)
+    return None
+  if isinstance(attr_type, type) and issubclass(attr_type, AbstractStruct):
+    return lambda x: decode_struct(x, attr_type)
+  return None
+
+
+def jsonable_node(x):
+  if not isinstance(x, AbstractStruct):
+    return jsonable(x)
+  _ = getattr(x.__class__, '__overlay__', None)
+  if not _:
+    try:
+      _ = Model.overlay_of(x.__class__)
+    except ModelException:
+      return jsonable_struct(x)
+  return _.encoder_of(True)(x)
+
+
+def jsonable_nodes(x):
+  return ArrayWriter(itertools.imap(jsonable_node, x)) \
+    if x is not None else None
+
+
+def nests_structs(attr_opts):
+  _ = attr_opts.item_type if attr_opts.type == list else attr_opts.type
+  return isinstance(_, type) and issubclass(_, AbstractStruct)
+
+
+def jsonable_structs(x, item_type):
+  _ = getattr(item_type, '__overlay__', None)
+  if not _:
+    return [jsonable_struct(i) for i in x]
+  encoder = _.encoder_of()
+  return [encoder(i) if i.__class__ is item_type else jsonable_struct(i) \
+    for i in x]
+
+
+def jsonable_temporal(x):
+  return x.isoformat() if hasattr(x, 'isoformat') else jsonable(x)
+
+
+def coercing_converter_of(converter):
+  if not converter:
+    return lambda x: x.coerce() if x.__class__ is DeferredList else x
+  return lambda x: converter(x.coerce() \
+    if x.__class__ is DeferredList else x)
+
+
+def converter_of(attr_type, item_type = None):
+  if attr_type in (str, bool, int, long, float):
+    return None
+  if attr_type in (datetime.date, datetime.time, datetime.datetime):
+    return jsonable_temporal
+  if attr_type == list:
+    _ = converter_of(item_type if item_type else str)
+    if not _:
+      return None
+    if _ == jsonable_struct:
+      return lambda x: jsonable_structs(x, item_type) \
+        if x is not None else None
+    return lambda x: [_(i) for i in x] if x is not None else None
+  if isinstance(attr_type, type) and issubclass(attr_type, AbstractStruct):
+    return jsonable_struct
+  return jsonable
+
+
+def options_converter_of(attr_opts):
+  if attr_opts.type == list and attr_opts.item_type == list:
+    _ = options_converter_of(ListType.item_options(attr_opts))
+    if not _:
+      return None
+    return lambda x: [_(i) for i in x] if x is not None else None
+  return converter_of(attr_opts.type, attr_opts.item_type)
+
+
+def nested_overlays(overlay):
+  seen = set([overlay])
+  pending = [overlay]
+  while pending:
+    for attr_opts in pending.pop().attrs.values():
+      while attr_opts.type == list:
+        attr_opts = ListType.item_options(attr_opts)
+      _ = getattr(attr_opts.type, '__overlay__', None)
+      if _ is not None and _ not in seen:
+        seen.add(_)
+        pending.append(_)
+  seen.discard(overlay)
+  return list(seen)
 
 
 class StructOverlay(object):
 
+  stamped = weakref.WeakSet()
+
   def __init__(self, struct_name, **struct_opts):
     self.name = struct_name
     self.opts = StructOptions(struct_name, **struct_opts)
     self.validators = []
     self.attrs = {}
+    self.struct_cls = None
+    self.plan = {}
+    self.compiled = {}
+    self.generation = 0
+    self.lazy = {}
+    self.layout = {}
+    self.names = []
+    self.shared = False
+    self.implicit = set()
+    self.frozen = False
+    self.implicit_setter = None
+    self.token = None
+    self.nested = frozenset()
 
   def add_attribute(self, attr_name, **attr_opts):
+    self.check_mutable()
     opts = AttributeOptions(self.name, attr_name, **attr_opts)
     self.attrs[attr_name] = opts
+    self.implicit.discard(attr_name)
+    self.invalidate(attr_name)
     return opts
 
+  def add_implicit(self, attr_name):
+    self.check_mutable()
+    opts = AttributeOptions(self.name, attr_name)
+    self.attrs[attr_name] = opts
+    self.implicit.add(attr_name)
+    return opts
+
+  def add_attributes(self, attrs):
+    self.check_mutable()
+    for attr_name, attr_opts in attrs:
+      self.attrs[attr_name] = AttributeOptions(self.name, attr_name,
+        **attr_opts)
+      self.implicit.discard(attr_name)
+      self.plan.pop(attr_name, None)
+      self.bind_lazy(attr_name)
+    self.invalidate()
+
   def del_attribute(self, attr_name):
-    return self.attrs.pop(attr_name, None)
+    self.check_mutable()
+    _ = self.attrs.pop(attr_name, None)
+    self.implicit.discard(attr_name)
+    self.invalidate(attr_name)
+    for kind in ('setter', 'column', 'pipeline'):
+      Source.release((self.name, attr_name, kind))
+    return _
 
   def set_options(self, **struct_opts):
+    self.check_mutable()
     self.opts.update(
       StructOptions.filter_internals(struct_opts))
+    self.invalidate()
 
   def set_attribute_options(self, attr_name, **attr_opts):
+    self.check_mutable()
     if attr_name in self.attrs:
       self.attrs[attr_name].update(
         AttributeOptions.filter_internals(attr_opts))
+      self.implicit.discard(attr_name)
+      self.invalidate(attr_name)
 
   def unset_options(self, *struct_opts):
+    self.check_mutable()
     for key in struct_opts:
       if key not in StructOptions.internals:
         self.opts.pop(key, None)
+    self.invalidate()
 
   def unset_attribute_options(self, attr_name, *attr_opts):
+    self.check_mutable()
     if attr_name in self.attrs:
       for key in attr_opts:
         if key not in AttributeOptions.internals:
           self.attrs[attr_name].pop(key, None)
+      self.implicit.discard(attr_name)
+      self.invalidate(attr_name)
 
   def add_validator(self, validator, **validator_opts):
+    self.check_mutable()
     self.validators.append((validator, validator_opts))
+    self.invalidate()
 
-  def process_set_value(self, attr_name, value):
-    if attr_name.startswith('_'):
-      return value
+  def check_mutable(self):
+    if self.frozen:
+      raise UnexpectedError('%s: overlay is frozen' % self.name)
+
+  def invalidate(self, attr_name = None):
+    self.check_mutable()
+    self.generation += 1
+    self.expire()
+    if attr_name:
+      self.plan.pop(attr_name, None)
+      if attr_name in self.attrs:
+        self.attrs[attr_name].touch()
+      self.bind_lazy(attr_name)
+
+  def bind_lazy(self, attr_name):
     attr_opts = self.attrs.get(attr_name, None)
-    if not attr_opts:
-      if self.opts.open:
-        attr_opts = self.add_attribute(attr_name)
-      else:
-        raise UndefinedAttributeError(self.name, attr_name)
-    return DataType.process_value(attr_opts, value)
+    lazy = attr_opts is not None and attr_opts.lazy and \
+      issubclass(attr_opts.type, AbstractStruct)
+    if lazy:
+      self.lazy[attr_name] = materializer_of(attr_opts)
+    else:
+      self.lazy.pop(attr_name, None)
+    struct_cls = self.struct_cls
+    if not struct_cls or attr_name.startswith('_'):
+      return
+    routed = lazy or self.shared and attr_opts is not None and \
+      issubclass(attr_opts.type, (AbstractStruct, list))
+    _ = getattr(struct_cls, attr_name, None)
+    if routed and _ is None:
+      setattr(struct_cls, attr_name, LazyAttribute(attr_name))
+    elif not routed and isinstance(_, LazyAttribute) and \
+      attr_name in struct_cls.__dict__:
+      delattr(struct_cls, attr_name)
+
+  def replan(self):
+    self.plan.clear()
+    for attr_opts in self.attrs.values():
+      attr_opts.touch()
+    self.invalidate()
+
+  def warm_up(self):
+    for attr_name, attr_opts in self.attrs.items():
+      self.setter_of(attr_name)
+      self.column_of(attr_name)
+      item_opts = attr_opts
+      while item_opts.type == list:
+        item_opts = ListType.item_options(item_opts)
+        DataType.setter_of(item_opts)
+        DataType.column_of(item_opts)
+      if self.opts.compact:
+        self.slot_of(attr_name)
+    if self.opts.open:
+      self.implicit_setter = DataType.setter_of(
+        AttributeOptions(self.name, '*'))
+    self.validator_of()
+    self.checker_of()
+    self.encoder_of()
+    self.encoder_of(True)
+    self.decoder_of()
+    self.dumper_of()
+    self.stamp()
+    self.fingerprint()
+    self.packer_of()
+    self.unpacker_of()
+
+  def share(self):
+    if not self.shared:
+      self.shared = True
+      for attr_name in self.attrs.keys():
+        self.bind_lazy(attr_name)
+
+  def artifacts(self):
+    compiled = self.compiled
+    if compiled.get('generation', None) != self.generation:
+      compiled.clear()
+      compiled['generation'] = self.generation
+    return compiled
+
+  def stamp(self):
+    if self.token is None:
+      self.nested = frozenset(nested_overlays(self))
+      self.token = object()
+      StructOverlay.stamped.add(self)
+    return self.token
+
+  def expire(self):
+    self.token = None
+    StructOverlay.stamped.discard(self)
+    for _ in list(StructOverlay.stamped):
+      if self in _.nested:
+        _.token = None
+        StructOverlay.stamped.discard(_)
+
+  def slot_of(self, attr_name):
+    _ = self.layout.get(attr_name, None)
+    if _ is None:
+      _ = len(self.names)
+      self.names.append(attr_name)
+      self.layout[attr_name] = _
+    return _
+
+  def setter_of(self, attr_name):
+    setter = self.plan.get(attr_name, None)
+    if setter:
+      return setter
+    if attr_name.startswith('_'):
+      setter = hidden_value
+      if self.frozen:
+        return setter
+    else:
+      attr_opts = self.attrs.get(attr_name, None)
+      if not attr_opts:
+        if self.opts.open:
+          if self.frozen:
+            return self.implicit_setter
+          attr_opts = self.add_implicit(attr_name)
+        else:
+          raise UndefinedAttributeError(self.name, attr_name)
+      setter = DataType.setter_of(attr_opts)
+      if stats.enabled:
+        setter = stats.timed(setter, self.name, 'set', attr_name)
+    self.plan[attr_name] = setter
+    return setter
+
+  def column_of(self, attr_name):
+    if attr_name.startswith('_'):
+      return list
+    self.setter_of(attr_name)
+    return DataType.column_of(self.attrs[attr_name])
+
+  def process_set_value(self, attr_name, value):
+    return self.setter_of(attr_name)(value)
 
   def process_del_value(self, attr_name):
     if attr_name.startswith('_'):
@@ -108,7 +643,7 @@ class StructOverlay(object):
           else:
             raise UnexpectedError(
               'unsupported list type: %s' % type(_))
-          if _ and issubclass(attr_opts.cache.item.type,
+          if _ and issubclass(ListType.item_options(attr_opts).type,
             AbstractStruct):
             for nested_struct in _:
               if nested_struct != None:
@@ -119,28 +654,532 @@ class StructOverlay(object):
           raise StructValidationError(
             self.name, validator[1].get('message', None))
 
+  def validate(self, struct, strict = False):
+    if not isinstance(struct, AbstractStruct):
+      raise InvalidStructType(struct.__class__)
+    self.validator_of()(struct, strict)
+
+  def validator_of(self):
+    compiled = self.artifacts()
+    validator = compiled.get('validator', None)
+    if not validator:
+      validator = self.compile_validator()
+      if stats.enabled:
+        validator = stats.timed(validator, self.name, 'validate')
+      compiled['validator'] = validator
+    return validator
+
+  def compile_validator(self):
+    source = Source('validator', 'struct', 'strict = False', 'dirty = None')
+    missing = source.bind(object())
+    link = source.bind(link_node)
+    source.emit('get = struct.get')
+    for attr_opts in self.attrs.values():
+      attr_name = attr_opts.name
+      attr_type = attr_opts.type
+      if attr_name.startswith('_') or attr_name in self.implicit:
+        continue
+      symbols = {
+        'name': source.bind(attr_name),
+        'namespace': source.bind(attr_opts.namespace),
+        'setter_of': source.bind(self.setter_of),
+        'missing': missing,
+        'link': link
+      }
+      source.emit('if dirty is None or %(name)s in dirty:\n  pass' % symbols)
+      _ = attr_opts.default
+      if _ and hasattr(_, '__call__'):
+        symbols['default'] = source.bind(_)
+        symbols['default_args'] = source.bind(attr_opts.default_args)
+        source.emit((
+          'value = %(default)s(*%(default_args)s)' \
+            if attr_opts.default_args else \
+          'value = %(default)s()') % symbols, 1)
+        source.emit(
+          'if value != None:\n'
+          '  struct[%(name)s] = %(setter_of)s(%(name)s)(value)' % symbols, 1)
+      elif _ != None:
+        symbols['default'] = source.bind(_)
+        source.emit(
+          'struct[%(name)s] = %(setter_of)s(%(name)s)(%(default)s)' % symbols,
+          1)
+      if attr_opts.required:
+        symbols['missing_attribute'] = source.bind(
+          MissingRequireAttributeError)
+        symbols['missing_value'] = source.bind(MissingRequiredValueError)
+        source.emit((
+          'value = get(%(name)s, %(missing)s)\n'
+          'if value is %(missing)s:\n'
+          '  raise %(missing_attribute)s(%(namespace)s, %(name)s)\n' + (
+          'if value is None:\n' if attr_type == list else
+          'if value == None:\n') +
+          '  raise %(missing_value)s(%(namespace)s, %(name)s)') % symbols, 1)
+      if issubclass(attr_type, AbstractStruct):
+        source.emit(
+          'value = get(%(name)s, None)\n'
+          'if value is not None:\n'
+          '  value.validate(strict)\n'
+          '  %(link)s(value, struct, %(name)s)' % symbols, 1)
+      elif attr_type == list:
+        symbols['custom_list'] = source.bind(CustomList)
+        symbols['unexpected'] = source.bind(UnexpectedError)
+        symbols['missing_value'] = source.bind(MissingRequiredValueError)
+        source.emit('value = get(%(name)s, None)' % symbols, 1)
+        if attr_opts.min_length > 0:
+          source.emit(
+            'if value is None:\n'
+            '  raise %(missing_value)s(%(namespace)s, %(name)s)' % symbols, 1)
+        else:
+          source.emit('if value is None:\n  pass', 1)
+        source.emit(
+          'elif not isinstance(value, %(custom_list)s):\n'
+          '  raise %(unexpected)s(\n'
+          '    \'unsupported list type: %%s\' %% type(value))\n'
+          'else:\n'
+          '  value.check_length(0)\n'
+          '  %(link)s(value, struct, %(name)s)' % symbols, 1)
+        depth = 2
+        if attr_opts.lazy:
+          source.emit('if strict:\n  value.coerce()', 2)
+          depth = 3
+        _ = attr_opts.item_type
+        if issubclass(_ if _ else str, AbstractStruct):
+          source.emit(
+            'for item in value:\n'
+            '  if item is not None:\n'
+            '    item.validate(strict)\n'
+            '    %(link)s(item, value, None)' % symbols, depth)
+    for validator in self.validators:
+      _ = validator[0]
+      if stats.enabled:
+        _ = stats.timed(_, self.name, 'validator', stats.name_of(_))
+      source.emit(
+        'if not %s(struct):\n'
+        '  raise %s(%s, %s)' % (
+          source.bind(_), source.bind(StructValidationError),
+            source.bind(self.name), source.bind(
+              validator[1].get('message', None))))
+    return source.compile((self.name, 'validator'))
+
+  def check(self, struct):
+    if not isinstance(struct, AbstractStruct):
+      raise InvalidStructType(struct.__class__)
+    errors = []
+    self.checker_of()(struct, errors, '')
+    return errors
+
+  def check_row(self, row, struct_cls = None):
+    struct_cls = struct_cls if struct_cls else self.struct_cls
+    if isinstance(row, AbstractStruct):
+      return row, self.check(row)
+    struct = struct_cls()
+    errors = []
+    failed = set()
+    for key, value in row.iteritems():
+      try:
+        struct[key] = value
+      except Exception, e:
+        errors.append(violation_of(key, e))
+        failed.add(key)
+    if not failed:
+      self.checker_of()(struct, errors, '')
+      return struct, errors
+    checked = []
+    self.checker_of()(struct, checked, '')
+    errors.extend(_ for _ in checked if _.path not in failed or \
+      _.code != 'MissingRequireAttributeError')
+    return struct, errors
+
+  def checker_of(self):
+    compiled = self.artifacts()
+    checker = compiled.get('checker', None)
+    if not checker:
+      checker = self.compile_checker()
+      compiled['checker'] = checker
+    return checker
+
+  def compile_checker(self):
+    source = Source('checker', 'struct', 'errors', 'path')
+    missing = source.bind(object())
+    source.emit(
+      'get = struct.get\n'
+      'append = errors.append')
+    for attr_opts in self.attrs.values():
+      attr_name = attr_opts.name
+      attr_type = attr_opts.type
+      if attr_name.startswith('_') or attr_name in self.implicit:
+        continue
+      symbols = {
+        'name': source.bind(attr_name),
+        'attribute': source.bind(qname(self.name, attr_name)),
+        'prefix': source.bind(attr_name + '.'),
+        'setter_of': source.bind(self.setter_of),
+        'violation': source.bind(Violation),
+        'violation_of': source.bind(violation_of),
+        'check': source.bind(check_struct),
+        'missing': missing
+      }
+      _ = attr_opts.default
+      if _ and hasattr(_, '__call__'):
+        symbols['default'] = source.bind(_)
+        symbols['default_args'] = source.bind(attr_opts.default_args)
+        source.emit((
+          'value = %(default)s(*%(default_args)s)' \
+            if attr_opts.default_args else \
+          'value = %(default)s()') % symbols)
+        source.emit(
+          'if value != None:\n'
+          '  struct[%(name)s] = %(setter_of)s(%(name)s)(value)' % symbols)
+      elif _ != None:
+        symbols['default'] = source.bind(_)
+        source.emit(
+          'struct[%(name)s] = %(setter_of)s(%(name)s)(%(default)s)' % symbols)
+      if attr_opts.required:
+        source.emit((
+          'value = get(%(name)s, %(missing)s)\n'
+          'if value is %(missing)s:\n'
+          '  append(%(violation)s(path + %(name)s,\n'
+          '    \'MissingRequireAttributeError\',\n'
+          '      {\'attribute\': %(attribute)s}))\n' + (
+          'elif value is None:\n' if attr_type == list else
+          'elif value == None:\n') +
+          '  append(%(violation)s(path + %(name)s,\n'
+          '    \'MissingRequiredValueError\',\n'
+          '      {\'attribute\': %(attribute)s}))') % symbols)
+      if issubclass(attr_type, AbstractStruct):
+        source.emit(
+          'value = get(%(name)s, None)\n'
+          'if value is not None:\n'
+          '  %(check)s(value, errors, path + %(prefix)s)' % symbols)
+      elif attr_type == list:
+        symbols['custom_list'] = source.bind(CustomList)
+        source.emit('value = get(%(name)s, None)' % symbols)
+        if attr_opts.min_length > 0:
+          source.emit(
+            'if value is None:\n'
+            '  append(%(violation)s(path + %(name)s,\n'
+            '    \'MissingRequiredValueError\',\n'
+            '      {\'attribute\': %(attribute)s}))' % symbols)
+        else:
+          source.emit('if value is None:\n  pass')
+        source.emit(
+          'elif not isinstance(value, %(custom_list)s):\n'
+          '  append(%(violation)s(path + %(name)s, \'UnexpectedError\',\n'
+          '    {\'attribute\': %(attribute)s, \'type\': type(value)}))\n'
+          'else:\n'
+          '  size = len(value)' % symbols)
+        bounds = []
+        if attr_opts.min_length:
+          bounds.append('size < %d' % attr_opts.min_length)
+        if attr_opts.max_length:
+          bounds.append('size > %d' % attr_opts.max_length)
+        if bounds:
+          symbols['bounds'] = ' or '.join(bounds)
+          symbols['min_length'] = attr_opts.min_length or None
+          symbols['max_length'] = attr_opts.max_length or None
+          source.emit(
+            'if %(bounds)s:\n'
+            '  append(%(violation)s(path + %(name)s,\n'
+            '    \'ListBoundaryViolationError\',\n'
+            '      {\'attribute\': %(attribute)s, \'estimated_length\': size,\n'
+            '        \'min_length\': %(min_length)r,\n'
+            '          \'max_length\': %(max_length)r}))' % symbols, 1)
+        _ = attr_opts.item_type
+        nested = issubclass(_ if _ else str, AbstractStruct)
+        if attr_opts.lazy:
+          source.emit((
+            'try:\n'
+            '  value.coerce()\n'
+            'except Exception, e:\n'
+            '  append(%(violation_of)s(path + %(name)s, e))' + (
+            '\nelse:' if nested else '')) % symbols, 1)
+        if nested:
+          source.emit(
+            'for i, item in enumerate(value):\n'
+            '  if item is not None:\n'
+            '    %(check)s(item, errors, \'%%s%%s[%%d].\' %% (path, %(name)s, i))'
+              % symbols, 2 if attr_opts.lazy else 1)
+    for validator in self.validators:
+      source.emit(
+        'try:\n'
+        '  if not %s(struct):\n'
+        '    append(%s(path[:-1], \'StructValidationError\',\n'
+        '      {\'name\': %s, \'explanation\': %s}))\n'
+        'except Exception, e:\n'
+        '  append(%s(path[:-1], e))' % (
+          source.bind(validator[0]), source.bind(Violation),
+            source.bind(self.name), source.bind(
+              validator[1].get('message', None)), source.bind(violation_of)))
+    return source.compile((self.name, 'checker'))
+
+  def encoder_of(self, shallow = False):
+    compiled = self.artifacts()
+    _ = 'shallow_encoder' if shallow else 'encoder'
+    encoder = compiled.get(_, None)
+    if not encoder:
+      encoder = self.compile_encoder(shallow)
+      compiled[_] = encoder
+    return encoder
+
+  def compile_encoder(self, shallow = False):
+    names = frozenset(self.attrs).difference(self.implicit)
+    converters = []
+    for attr_opts in self.attrs.values():
+      if attr_opts.name in self.implicit:
+        continue
+      if shallow and nests_structs(attr_opts):
+        _ = jsonable_nodes if attr_opts.type == list else jsonable_node
+      else:
+        _ = options_converter_of(attr_opts)
+        if attr_opts.lazy and attr_opts.type == list:
+          _ = coercing_converter_of(_)
+      if _:
+        converters.append((attr_opts.name, _))
+    def encoder(struct):
+      result = {k: v for k, v in struct.__dict__.iteritems() \
+        if not k.startswith('_')}
+      for name, converter in converters:
+        if name in result:
+          result[name] = converter(result[name])
+      if not names.issuperset(result):
+        for name in result:
+          if name not in names:
+            result[name] = jsonable(result[name])
+      return result
+    return encoder
+
+  def decoder_of(self):
+    compiled = self.artifacts()
+    decoder = compiled.get('decoder', None)
+    if not decoder:
+      decoder = self.compile_decoder()
+      compiled['decoder'] = decoder
+    return decoder
+
+  def compile_decoder(self):
+    plan = self.plan
+    setter_of = self.setter_of
+    decoders = {}
+    for attr_opts in self.attrs.values():
+      if attr_opts.name in self.implicit:
+        continue
+      _ = decoder_of(attr_opts.type, attr_opts.item_type)
+      if _ and not attr_opts.lazy:
+        decoders[attr_opts.name] = _
+    def decoder(source, struct_cls):
+      struct = struct_cls()
+      if overrides_setitem(struct_cls):
+        for key, value in source.iteritems():
+          _ = decoders.get(key, None)
+          struct[key] = _(value) if _ else value
+        source.clear()
+        return struct
+      compact = getattr(struct_cls, '__layout__', None) is not None
+      values = {} if compact else struct.__dict__
+      for key, value in source.iteritems():
+        _ = decoders.get(key, None)
+        if _:
+          value = _(value)
+        setter = plan.get(key, None)
+        if not setter:
+          setter = setter_of(key)
+        values[key] = setter(value)
+      source.clear()
+      if compact:
+        struct.__setstate__(values)
+      return struct
+    return decoder
+
+  def from_json(self, text, struct_cls = None):
+    struct_cls = struct_cls if struct_cls else self.struct_cls
+    decoder = self.decoder_of()
+    _ = json.loads(text)
+    if isinstance(_, dict):
+      return decoder(_, struct_cls)
+    if isinstance(_, list):
+      for i, item in enumerate(_):
+        if not isinstance(item, dict):
+          raise IncompatibleSourceError(struct_cls, type(item))
+        _[i] = decoder(item, struct_cls)
+      return _
+    raise IncompatibleSourceError(struct_cls, type(_))
+
+  def build_many(self, rows, struct_cls = None, errors = None):
+    struct_cls = struct_cls if struct_cls else self.struct_cls
+    rows = rows if isinstance(rows, list) else list(rows)
+    if overrides_setitem(struct_cls):
+      return self.build_each(rows, struct_cls, errors)
+    new = struct_cls.__new__ if struct_cls.__init__.__func__ is \
+      AbstractStruct.__init__.__func__ else None
+    compact = getattr(struct_cls, '__layout__', None) is not None
+    result = [None] * len(rows)
+    failures = {}
+    for keys, indices in group_rows(rows):
+      if not keys:
+        for i in indices:
+          result[i] = struct_cls()
+        continue
+      group = rows if len(indices) == len(rows) else \
+        [rows[i] for i in indices]
+      _ = map(operator.itemgetter(*keys), group)
+      columns = zip(*_) if len(keys) > 1 else [_]
+      for j, key in enumerate(keys):
+        try:
+          columns[j] = self.column_of(key)(columns[j])
+        except Exception:
+          columns[j] = self.build_column(key, columns[j], indices, failures)
+      values = map(dict, itertools.imap(itertools.izip,
+        itertools.repeat(keys), zip(*columns)))
+      if failures:
+        indices, values = zip(*[_ for _ in itertools.izip(indices, values) \
+          if _[0] not in failures]) or ((), ())
+      if new:
+        structs = map(new, itertools.repeat(struct_cls, len(values)))
+      else:
+        structs = [struct_cls() for _ in values]
+      if compact:
+        map(CompactStruct.__setstate__, structs, values)
+      elif new:
+        map(object.__setattr__, structs,
+          itertools.repeat('__dict__', len(values)), values)
+      else:
+        map(dict.update, [_.__dict__ for _ in structs], values)
+      for i, struct in itertools.izip(indices, structs):
+        result[i] = struct
+    if failures:
+      if errors is None:
+        _ = min(failures)
+        raise RowProcessingError(_, failures[_])
+      errors.extend(sorted(failures.iteritems()))
+    return result
+
+  def build_each(self, rows, struct_cls, errors):
+    result = [None] * len(rows)
+    failures = {}
+    for i, row in enumerate(rows):
+      try:
+        result[i] = struct_cls(**row)
+      except Exception, e:
+        failures[i] = e
+    if failures:
+      if errors is None:
+        _ = min(failures)
+        raise RowProcessingError(_, failures[_])
+      errors.extend(sorted(failures.iteritems()))
+    return result
+
+  def build_column(self, key, column, indices, failures):
+    try:
+      setter = self.setter_of(key)
+    except Exception, e:
+      for i in indices:
+        failures.setdefault(i, e)
+      return [None] * len(indices)
+    values = []
+    for i, value in itertools.izip(indices, column):
+      try:
+        values.append(setter(value))
+      except Exception, e:
+        failures.setdefault(i, e)
+        values.append(None)
+    return values
+
   def to_json(self, struct):
-    def __json__(x):
-      if hasattr(x, '__dict__'):
-        return {k: v for k, v in x.__dict__.items() if not k.startswith('_')}
-      if hasattr(x, 'isoformat'):
-        return x.isoformat()
-      return str(x)
     if not isinstance(struct, AbstractStruct):
       raise InvalidStructType(struct.__class__)
-    return json.dumps(struct,
-        default = __json__,
+    return self.dumper_of()(struct)
+
+  def dumper_of(self):
+    compiled = self.artifacts()
+    dumper = compiled.get('dumper', None)
+    if not dumper:
+      encoder = self.encoder_of()
+      encode = json.JSONEncoder(
         indent = self.opts.json_indent,
         separators = (
           self.opts.json_item_sep,
           self.opts.json_dict_sep
         )
-      )
+      ).encode
+      dumper = lambda struct: encode(encoder(struct))
+      if stats.enabled:
+        dumper = stats.timed(dumper, self.name, 'to_json')
+      compiled['dumper'] = dumper
+    return dumper
+
+  def fingerprint(self):
+    compiled = self.artifacts()
+    _ = compiled.get('fingerprint', None)
+    stamp = self.stamp()
+    if not _ or _[0] is not stamp:
+      _ = (stamp, codec.fingerprint_of(self))
+      compiled['fingerprint'] = _
+    return _[1]
+
+  def packer_of(self):
+    compiled = self.artifacts()
+    packer = compiled.get('packer', None)
+    if not packer:
+      packer = codec.compile_packer(self)
+      compiled['packer'] = packer
+    return packer
+
+  def unpacker_of(self):
+    compiled = self.artifacts()
+    unpacker = compiled.get('unpacker', None)
+    if not unpacker:
+      unpacker = codec.compile_unpacker(self)
+      compiled['unpacker'] = unpacker
+    return unpacker
+
+  def to_bytes(self, struct):
+    if not isinstance(struct, AbstractStruct):
+      raise InvalidStructType(struct.__class__)
+    parts = [self.fingerprint()]
+    self.packer_of()(struct, parts)
+    return ''.join(parts)
+
+  def from_bytes(self, buf, struct_cls = None):
+    struct_cls = struct_cls if struct_cls else self.struct_cls
+    buf = memoryview(buf)
+    found = buf[:8].tobytes()
+    if found != self.fingerprint():
+      raise SchemaMismatchError(struct_cls,
+        binascii.hexlify(self.fingerprint()), binascii.hexlify(found))
+    struct, offset = codec.unpack_from(self.unpacker_of(), buf, 8,
+      struct_cls, self.name)
+    if offset != len(buf):
+      raise UnexpectedError('%d trailing bytes after %s' % (
+        len(buf) - offset, self.name))
+    return struct
+
+  def iter_dump(self, source, chunk_size = 65536):
+    if isinstance(source, AbstractStruct):
+      source = self.encoder_of(True)(source)
+    elif isinstance(source, (dict, basestring)) or \
+      not hasattr(source, '__iter__'):
+      raise InvalidStructType(source.__class__)
+    else:
+      source = jsonable_nodes(source)
+    return buffered(json.JSONEncoder(
+        indent = self.opts.json_indent,
+        separators = (
+          self.opts.json_item_sep,
+          self.opts.json_dict_sep
+        ),
+        default = jsonable_node
+      ).iterencode(source), chunk_size)
+
+  def dump(self, source, fp, chunk_size = 65536):
+    for _ in self.iter_dump(source, chunk_size):
+      fp.write(_)
 
 
 class Model(object):
 
   registry = {}
+  compacted = weakref.WeakSet()
+  frozen = False
 
   @classmethod
   def overlay(cls, struct_name):
@@ -154,9 +1193,24 @@ class Model(object):
     def decorator(struct_cls):
       if not issubclass(struct_cls, AbstractStruct):
         raise InvalidStructType(struct_cls)
+      if cls.frozen:
+        raise UnexpectedError('model is frozen')
       _ = struct_name if struct_name else struct_cls.__name__
+      overlay = StructOverlay(_, **struct_opts)
+      if overlay.opts.compact:
+        if overlay.opts.open:
+          raise UnexpectedError(
+            '%s: open structs can not be compact' % _)
+        # Slots can't be added to an existing class, so compact structs are
+        # declared on a generated subclass that callers must use instead.
+        cls.compacted.add(struct_cls)
+        struct_cls = compact_class_of(struct_cls, overlay)
+      overlay.struct_cls = struct_cls
       setattr(struct_cls, '__internal_name__', _)
-      cls.registry[_] = StructOverlay(_, **struct_opts)
+      setattr(struct_cls, '__overlay__', overlay)
+      setattr(struct_cls, '__plan__', overlay.plan)
+      setattr(struct_cls, '__lazy__', overlay.lazy)
+      cls.registry[_] = overlay
       return struct_cls
     return decorator
 
@@ -179,11 +1233,177 @@ class Model(object):
       return struct_cls
     return decorator
 
+  @classmethod
+  def loads(cls, struct_cls, text):
+    return cls.overlay_of(struct_cls).from_json(text, struct_cls)
+
+  @classmethod
+  def build_many(cls, struct_cls, rows, errors = None):
+    return cls.overlay_of(struct_cls).build_many(rows, struct_cls, errors)
+
+  @classmethod
+  def validate_many(cls, struct_cls, rows, workers = None, chunk_size = 1000,
+    errors = None):
+    cls.overlay_of(struct_cls)
+    chunks = ((struct_cls, offset, _) \
+      for offset, _ in chunks_of(rows, chunk_size))
+    pool = multiprocessing.Pool(workers) \
+      if workers and workers > 1 else None
+    try:
+      for structs, failures in pool.imap(validate_chunk, chunks) \
+        if pool else itertools.imap(validate_chunk, chunks):
+        if failures:
+          if errors is None:
+            raise RowProcessingError(*failures[0])
+          errors.extend(failures)
+        for struct in structs:
+          yield struct
+      if pool:
+        pool.close()
+        pool.join()
+    finally:
+      if pool:
+        pool.terminate()
+
+  @classmethod
+  def check_many(cls, struct_cls, rows):
+    overlay = cls.overlay_of(struct_cls)
+    for row in rows:
+      yield overlay.check_row(row, struct_cls)
+
+  @classmethod
+  def iter_json(cls, struct_cls, fp, chunk_size = 65536):
+    overlay = cls.overlay_of(struct_cls)
+    for item in ArrayReader(fp, chunk_size, struct_cls):
+      if not isinstance(item, dict):
+        raise IncompatibleSourceError(struct_cls, type(item))
+      yield overlay.decoder_of()(item, struct_cls).validate()
+
+  @classmethod
+  def from_bytes(cls, struct_cls, buf):
+    return cls.overlay_of(struct_cls).from_bytes(buf, struct_cls)
+
+  @classmethod
+  def read_jsonl(cls, struct_cls, source, chunk_size = 1000, errors = None):
+    cls.overlay_of(struct_cls)
+    fp, owned = open_stream(source, 'rb')
+    try:
+      for offset, lines in chunks_of(fp, chunk_size):
+        structs, failures = parse_lines(struct_cls, offset, lines)
+        if failures:
+          if errors is None:
+            raise RowProcessingError(*failures[0])
+          errors.extend(failures)
+        for struct in structs:
+          if struct is not None:
+            yield struct
+    finally:
+      if owned:
+        fp.close()
+
+  @classmethod
+  def aiter_jsonl(cls, struct_cls, reader, batch_size = 1000,
+    executor = None, offload_size = 0, errors = None, loop = None):
+    cls.overlay_of(struct_cls)
+    return aio.JsonlStream(struct_cls, reader, parse_lines, batch_size,
+      executor = executor, offload_size = offload_size, errors = errors,
+        loop = loop)
+
+  @classmethod
+  def write_jsonl(cls, structs, source, chunk_size = 65536, errors = None):
+    fp, owned = open_stream(source, 'wb')
+    try:
+      for _ in buffered(encode_lines(structs, errors), chunk_size):
+        fp.write(_)
+    finally:
+      if owned:
+        fp.close()
+
+  @classmethod
+  def dump_many(cls, struct_cls, structs, fp, chunk_size = 65536):
+    cls.overlay_of(struct_cls).dump(structs, fp, chunk_size)
+
+  @classmethod
+  def write_columns(cls, struct_cls, structs, source):
+    overlay = cls.overlay_of(struct_cls)
+    fp, owned = (open(source, 'wb'), True) \
+      if isinstance(source, basestring) else (source, False)
+    try:
+      return columns.write_columns(overlay, structs, fp)
+    finally:
+      if owned:
+        fp.close()
+
+  @classmethod
+  def open_columns(cls, struct_cls, source):
+    return columns.ColumnStore(cls.overlay_of(struct_cls), source, struct_cls)
+
+  @classmethod
+  def load(cls, spec, classes = None, warm_up = False):
+    if isinstance(spec, basestring):
+      with open(spec, 'rb') as fp:
+        spec = json.load(fp)
+    declarations = schema.declarations_of(spec)
+    classes = classes if classes else {}
+    structs = dict((name, overlay.struct_cls) \
+      for name, overlay in cls.registry.iteritems())
+    loaded = {}
+    for name, struct_opts, _ in declarations:
+      struct_cls = classes.get(name, None) or type(name, (Struct,), {})
+      loaded[name] = structs[name] = cls.declare(name,
+        **struct_opts)(struct_cls)
+    for name, _, attrs in declarations:
+      cls.registry[name].add_attributes([(attr_name, schema.resolve_types(
+        attr_opts, structs)) for attr_name, attr_opts in attrs])
+    if warm_up:
+      for name in loaded:
+        cls.registry[name].warm_up()
+    return loaded
+
+  @classmethod
+  def freeze(cls):
+    start = stats.clock()
+    overlays = {}
+    for name, overlay in cls.registry.items():
+      _ = stats.clock()
+      overlay.warm_up()
+      overlays[name] = stats.clock() - _
+    for overlay in cls.registry.values():
+      overlay.frozen = True
+    cls.frozen = True
+    return {'seconds': stats.clock() - start, 'overlays': overlays}
+
+  @classmethod
+  def thaw(cls):
+    cls.frozen = False
+    for overlay in cls.registry.values():
+      overlay.frozen = False
+
+  @classmethod
+  def instrument(cls, enabled = True):
+    if cls.frozen:
+      raise UnexpectedError('model is frozen')
+    if stats.enabled != bool(enabled):
+      stats.enabled = bool(enabled)
+      for overlay in cls.registry.values():
+        overlay.replan()
+
+  @classmethod
+  def stats(cls):
+    return stats.snapshot()
+
+  @classmethod
+  def reset_stats(cls):
+    stats.reset()
+
   @classmethod
   def overlay_of(cls, struct_cls):
     if not issubclass(struct_cls, AbstractStruct):
       raise InvalidStructType(struct_cls)
     if not hasattr(struct_cls, '__internal_name__'):
+      if struct_cls in cls.compacted:
+        raise UnexpectedError('%s: declared as compact, use the class '
+          'returned by Model.declare' % struct_cls.__name__)
       raise UndeclaredStructError(struct_cls)
     _ = cls.registry.get(struct_cls.__internal_name__, None)
     if not _:
@@ -193,28 +1413,341 @@ class Model(object):
 
 class Struct(AbstractStruct):
 
+  __slots__ = ('__dirty__', '__parents__', '__shared__')
+
+  __overlay__ = None
+  __plan__ = {}
+  __lazy__ = {}
+  __layout__ = None
+
+  def __new__(cls, *args, **kwargs):
+    _ = object.__new__(cls)
+    set_dirty(_, None)
+    set_parents(_, None)
+    set_shared(_, None)
+    return _
+
   def __getitem__(self, key):
-    return self.__dict__.__getitem__(key)
+    value = self.__dict__.__getitem__(key)
+    if value.__class__ is dict and key in self.__lazy__:
+      value = self.__lazy__[key](value)
+      self.__dict__[key] = value
+      if self.__parents__:
+        link_node(value, self, key)
+    elif self.__shared__ and key in self.__shared__:
+      value = self.__unshare__(key)
+    return value
+
+  def __contains__(self, key):
+    return key in self.__dict__
+
+  def get(self, key, default = None):
+    value = self.__dict__.get(key, default)
+    if value.__class__ is dict and key in self.__lazy__ and \
+      key in self.__dict__:
+      value = self.__lazy__[key](value)
+      self.__dict__[key] = value
+      if self.__parents__:
+        link_node(value, self, key)
+    elif self.__shared__ and key in self.__shared__:
+      value = self.__unshare__(key)
+    return value
+
+  def iteritems(self):
+    for key in self.__shared__ or ():
+      self.__unshare__(key)
+    for key in self.__lazy__:
+      if self.__dict__.get(key, None).__class__ is dict:
+        self.__getitem__(key)
+    return self.__dict__.iteritems()
+
+  def __borrows__(self, key, node):
+    if self.__dict__.get(key, None) is not node:
+      return None
+    return bool(self.__shared__) and key in self.__shared__
+
+  def __unshare__(self, key):
+    value = unshare_value(self, key, self.__dict__[key])
+    self.__dict__[key] = value
+    return value
 
   def __setitem__(self, key, value):
-    final_value = Model.overlay_of(
-      self.__class__).process_set_value(
-        key, value)
-    self.__dict__.__setitem__(key, final_value)
+    setter = self.__plan__.get(key, None)
+    if not setter:
+      setter = Model.overlay_of(
+        self.__class__).setter_of(key)
+    value = setter(value)
+    if self.__parents__:
+      detach(self)
+      link_node(value, self, key)
+    self.__dict__[key] = value
+    if self.__shared__:
+      discard_shared(self, key)
+    if self.__dirty__ is not None:
+      self.__touch__(key)
 
   def __delitem__(self, key):
     Model.overlay_of(
       self.__class__).process_del_value(
         key)
+    if self.__parents__ and key in self.__dict__:
+      detach(self)
     self.__dict__.__delitem__(key)
+    if self.__shared__:
+      discard_shared(self, key)
+    if self.__dirty__ is not None:
+      self.__touch__(key)
 
-  def validate(self):
-    Model.overlay_of(
-      self.__class__).process_validate(
-        self)
+  def assign(self, **source):
+    if self.__class__.__setitem__.__func__ is not struct_setitem:
+      return AbstractStruct.assign(self, **source)
+    plan = self.__plan__
+    values = self.__dict__
+    overlay = None
+    linked = self.__parents__
+    if linked:
+      detach(self)
+    for key, value in source.iteritems():
+      setter = plan.get(key, None)
+      if not setter:
+        if not overlay:
+          overlay = Model.overlay_of(self.__class__)
+        setter = overlay.setter_of(key)
+      values[key] = value = setter(value)
+      if linked:
+        link_node(value, self, key)
+    if self.__shared__:
+      for key in source:
+        discard_shared(self, key)
+    if self.__dirty__ is not None:
+      for key in source:
+        self.__touch__(key)
     return self
 
+  def __touch__(self, key):
+    state = self.__dirty__
+    if state is None or key in state[1]:
+      return
+    set_dirty(self, (state[0], state[1].union((key,))))
+    touch_parents(self)
+
+  def validate(self, strict = False):
+    _ = self.__overlay__
+    if not _:
+      _ = Model.overlay_of(self.__class__)
+    state = self.__dirty__
+    stamp = _.token
+    if stamp is None:
+      stamp = _.stamp()
+    dirty = None
+    if state is not None and not strict and state[0] is stamp:
+      dirty = state[1]
+      if not dirty:
+        return self
+    set_dirty(self, None)
+    _.validator_of()(self, strict, dirty)
+    set_dirty(self, (stamp, CLEAN))
+    return self
+
+  def violations(self):
+    _ = self.__overlay__
+    if not _:
+      _ = Model.overlay_of(self.__class__)
+    errors = []
+    _.checker_of()(self, errors, '')
+    return errors
+
+  def copy(self, deep = False, cow = False):
+    _ = self.__class__.__new__(self.__class__)
+    keys = self.__dict__.keys()
+    object.__setattr__(_, '__dict__', dict(zip(keys, copy_values(self, _,
+      keys, self.__dict__.values(), deep, cow))))
+    return _
+
+  def __copy__(self):
+    return self.copy()
+
+  def __deepcopy__(self, memo):
+    return self.copy(True)
+
+  def __reduce__(self):
+    return (restore_struct, (self.__class__,), self.__dict__)
+
+  @classmethod
+  def from_json(cls, text):
+    return Model.loads(cls, text)
+
   def json(self):
     return Model.overlay_of(
       self.__class__).to_json(
         self)
+
+  def to_bytes(self):
+    return Model.overlay_of(
+      self.__class__).to_bytes(
+        self)
+
+  def iter_dump(self, chunk_size = 65536):
+    return Model.overlay_of(
+      self.__class__).iter_dump(
+        self, chunk_size)
+
+  def dump(self, fp, chunk_size = 65536):
+    Model.overlay_of(
+      self.__class__).dump(
+        self, fp, chunk_size)
+
+
+set_dirty = Struct.__dict__['__dirty__'].__set__
+set_parents = Struct.__dict__['__parents__'].__set__
+set_shared = Struct.__dict__['__shared__'].__set__
+struct_setitem = Struct.__dict__['__setitem__']
+
+
+class CompactStruct(object):
+
+  __slots__ = ()
+
+  def __new__(cls, *args, **kwargs):
+    _ = super(CompactStruct, cls).__new__(cls)
+    object.__setattr__(_, '__values__', [UNSET] * len(cls.__names__))
+    return _
+
+  @property
+  def __dict__(self):
+    return dict((name, value) for name, value in itertools.izip(
+      self.__names__, self.__values__) if value is not UNSET)
+
+  def __iter__(self):
+    return (name for name, value in itertools.izip(
+      self.__names__, self.__values__) if value is not UNSET)
+
+  def __len__(self):
+    return sum(1 for value in self.__values__ if value is not UNSET)
+
+  def __getitem__(self, key):
+    try:
+      value = self.__values__[self.__layout__[key]]
+    except (KeyError, IndexError):
+      raise KeyError(key)
+    if value is UNSET:
+      raise KeyError(key)
+    if value.__class__ is dict and key in self.__lazy__:
+      value = self.__lazy__[key](value)
+      store_value(self, key, value)
+      if self.__parents__:
+        link_node(value, self, key)
+    elif self.__shared__ and key in self.__shared__:
+      value = self.__unshare__(key)
+    return value
+
+  def __contains__(self, key):
+    _ = self.__layout__.get(key, None)
+    values = self.__values__
+    return _ is not None and _ < len(values) and values[_] is not UNSET
+
+  def get(self, key, default = None):
+    _ = self.__layout__.get(key, None)
+    values = self.__values__
+    if _ is None or _ >= len(values) or values[_] is UNSET:
+      return default
+    value = values[_]
+    if value.__class__ is dict and key in self.__lazy__:
+      value = self.__lazy__[key](value)
+      values[_] = value
+      if self.__parents__:
+        link_node(value, self, key)
+    elif self.__shared__ and key in self.__shared__:
+      value = self.__unshare__(key)
+    return value
+
+  def iteritems(self):
+    for key in self.__shared__ or ():
+      self.__unshare__(key)
+    for key in self.__lazy__:
+      self.get(key)
+    return ((name, value) for name, value in itertools.izip(
+      self.__names__, self.__values__) if value is not UNSET)
+
+  def __borrows__(self, key, node):
+    _ = self.__layout__.get(key, None)
+    values = self.__values__
+    if _ is None or _ >= len(values) or values[_] is not node:
+      return None
+    return bool(self.__shared__) and key in self.__shared__
+
+  def __unshare__(self, key):
+    value = unshare_value(self, key,
+      self.__values__[self.__layout__[key]])
+    store_value(self, key, value)
+    return value
+
+  def __setitem__(self, key, value):
+    setter = self.__plan__.get(key, None)
+    if not setter:
+      setter = Model.overlay_of(self.__class__).setter_of(key)
+    value = setter(value)
+    if self.__parents__:
+      detach(self)
+      link_node(value, self, key)
+    store_value(self, key, value)
+    if self.__shared__:
+      discard_shared(self, key)
+    if self.__dirty__ is not None:
+      self.__touch__(key)
+
+  def __delitem__(self, key):
+    Model.overlay_of(
+      self.__class__).process_del_value(
+        key)
+    if key not in self:
+      raise KeyError(key)
+    if self.__parents__:
+      detach(self)
+    self.__values__[self.__layout__[key]] = UNSET
+    if self.__shared__:
+      discard_shared(self, key)
+    if self.__dirty__ is not None:
+      self.__touch__(key)
+
+  def assign(self, **source):
+    if self.__class__.__setitem__.__func__ is not compact_setitem:
+      return AbstractStruct.assign(self, **source)
+    plan = self.__plan__
+    overlay = None
+    linked = self.__parents__
+    if linked:
+      detach(self)
+    for key, value in source.iteritems():
+      setter = plan.get(key, None)
+      if not setter:
+        if not overlay:
+          overlay = Model.overlay_of(self.__class__)
+        setter = overlay.setter_of(key)
+      value = setter(value)
+      if linked:
+        link_node(value, self, key)
+      store_value(self, key, value)
+    if self.__shared__:
+      for key in source:
+        discard_shared(self, key)
+    if self.__dirty__ is not None:
+      for key in source:
+        self.__touch__(key)
+    return self
+
+  def copy(self, deep = False, cow = False):
+    _ = self.__class__.__new__(self.__class__)
+    object.__setattr__(_, '__values__', copy_values(self, _, self.__names__,
+      self.__values__, deep, cow))
+    return _
+
+  def __reduce__(self):
+    return (restore_struct, (self.__class__,), dict(self.iteritems()))
+
+  def __setstate__(self, state):
+    for key, value in state.iteritems():
+      store_value(self, key, value)
+
+
+compact_setitem = CompactStruct.__dict__['__setitem__']
@@ -33,6 +33,7 @@ class StructOptions(Options):
   defaults = {
     'open': False,
     'lenient': False,
+    'compact': False,
     'json_indent': 2,
     'json_item_sep': ', ',
     'json_dict_sep': ': '
@@ -57,13 +58,25 @@ class AttributeOptions(Options):
     'normalize': False,
     'min_length': None,
     'max_length': None,
-    'format': None
+    'format': None,
+    'lazy': False
   }
 
-  internals = ('namespace', 'name', 'cache')
+  internals = ('namespace', 'name', 'cache', 'generation')
 
   def __init__(self, namespace, name, **opts):
     self.update(opts)
     self.name = name
     self.namespace = namespace
     self.cache = Options()
+    self.generation = 0
+
+  def touch(self):
+    self.generation += 1
+
+  def fresh_cache(self):
+    cache = self.cache
+    if cache.generation != self.generation:
+      cache.clear()
+      cache.generation = self.generation
+    return cache
@@ -0,0 +1,54 @@
+#
+# Copyright
+#
+
+
+import datetime
+
+from structmodel.exceptions import *
+
+
+TYPES = {
+  'str': str,
+  'bool': bool,
+  'int': int,
+  'long': long,
+  'float': float,
+  'date': datetime.date,
+  'time': datetime.time,
+  'datetime': datetime.datetime,
+  'list': list
+}
+
+SECTIONS = frozenset(['options', 'attributes'])
+
+
+def options_of(opts):
+  return dict((str(k), v) for k, v in opts.iteritems())
+
+
+def declarations_of(spec):
+  declarations = []
+  for name in sorted(spec):
+    declaration = spec[name]
+    if not isinstance(declaration, dict) or \
+      not SECTIONS.issuperset(declaration):
+      raise UnexpectedError('%s: invalid struct declaration' % name)
+    declarations.append((str(name),
+      options_of(declaration.get('options', {})),
+      [(str(attr_name), options_of(attr_opts)) for attr_name, attr_opts in \
+        sorted(declaration.get('attributes', {}).iteritems())]))
+  return declarations
+
+
+def resolve_types(opts, structs):
+  opts = dict(opts)
+  for key, value in opts.iteritems():
+    if (key == 'type' or key.endswith('_type')) and \
+      isinstance(value, basestring):
+      _ = TYPES.get(value, None) or structs.get(value, None)
+      if _ is None:
+        raise UnexpectedError('unknown type: %s' % value)
+      opts[key] = _
+  return opts
+
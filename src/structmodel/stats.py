@@ -0,0 +1,69 @@
+#
+# Copyright
+#
+
+
+import timeit
+
+
+clock = timeit.default_timer
+
+enabled = False
+
+entries = {}
+
+
+def entry_of(*key):
+  _ = entries.get(key, None)
+  if _ is None:
+    _ = [0, 0.0, 0]
+    entries[key] = _
+  return _
+
+
+def timed(func, *key):
+  entry = entry_of(*key)
+  def instrumented(*args):
+    start = clock()
+    try:
+      return func(*args)
+    except:
+      entry[2] += 1
+      raise
+    finally:
+      entry[0] += 1
+      entry[1] += clock() - start
+  return instrumented
+
+
+def name_of(func):
+  _ = getattr(func, '__self__', None)
+  name = getattr(func, '__name__', None) or func.__class__.__name__
+  if _ is not None:
+    return '%s.%s' % (_.__name__ if isinstance(_, type) else \
+      _.__class__.__name__, name)
+  return name
+
+
+def snapshot():
+  result = {}
+  for key, entry in entries.iteritems():
+    if not entry[0]:
+      continue
+    node = result
+    for _ in key[:-1]:
+      node = node.setdefault(_, {})
+    node[key[-1]] = {
+      'calls': entry[0],
+      'seconds': entry[1],
+      'errors': entry[2],
+      'mean': entry[1] / entry[0]
+    }
+  return result
+
+
+def reset():
+  for entry in entries.itervalues():
+    entry[0] = 0
+    entry[1] = 0.0
+    entry[2] = 0
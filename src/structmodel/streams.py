@@ -0,0 +1,137 @@
+#
+# Copyright
+#
+
+
+import gzip
+import io
+import itertools
+import json
+
+from structmodel.exceptions import *
+
+
+WHITESPACE = ' \t\n\r'
+
+MAX_ITEM_SIZE = 1 << 24
+
+VALUE_TYPES = {
+  '{': dict,
+  '"': unicode,
+  't': bool,
+  'f': bool,
+  'n': type(None)
+}
+
+
+def open_stream(source, mode = 'rb'):
+  if not isinstance(source, basestring):
+    return source, False
+  if not source.endswith('.gz'):
+    return open(source, mode), True
+  _ = gzip.open(source, mode)
+  return (io.BufferedReader(_) if 'r' in mode else io.BufferedWriter(_)), True
+
+
+class ArrayReader(object):
+
+  def __init__(self, fp, chunk_size = 65536, struct_type = None,
+    max_size = MAX_ITEM_SIZE):
+    self.fp = fp
+    self.struct_type = struct_type
+    self.chunk_size = chunk_size
+    self.max_size = max_size
+    self.decoder = json.JSONDecoder()
+    self.buffer = ''
+    self.index = 0
+    self.eof = False
+
+  def fill(self, size = None):
+    if self.eof:
+      return False
+    if self.index > self.chunk_size:
+      self.buffer = self.buffer[self.index:]
+      self.index = 0
+    _ = self.fp.read(max(size, self.chunk_size) if size else self.chunk_size)
+    if not _:
+      self.eof = True
+      return False
+    self.buffer += _
+    return True
+
+  def peek(self):
+    while True:
+      buffer = self.buffer
+      index = self.index
+      length = len(buffer)
+      while index < length and buffer[index] in WHITESPACE:
+        index += 1
+      self.index = index
+      if index < length:
+        return buffer[index]
+      if not self.fill():
+        return None
+
+  def value(self):
+    self.peek()
+    while True:
+      try:
+        value, end = self.decoder.raw_decode(self.buffer, self.index)
+        if end < len(self.buffer) or self.eof:
+          self.index = end
+          return value
+      except ValueError:
+        if self.eof or len(self.buffer) - self.index >= self.max_size:
+          raise
+      self.fill(len(self.buffer) - self.index)
+
+  def __iter__(self):
+    _ = self.peek()
+    if _ != '[':
+      raise IncompatibleSourceError(self.struct_type,
+        VALUE_TYPES.get(_, float) if _ else None)
+    self.index += 1
+    if self.peek() == ']':
+      self.index += 1
+      return
+    while True:
+      yield self.value()
+      _ = self.peek()
+      self.index += 1
+      if _ == ']':
+        return
+      if _ != ',':
+        raise ValueError('expecting \',\' or \']\' at offset %d, found %r' % (
+          self.index - 1, _))
+
+
+class ArrayWriter(list):
+
+  def __init__(self, items):
+    super(ArrayWriter, self).__init__()
+    self.items = iter(items)
+    self.head = list(itertools.islice(self.items, 1))
+
+  def __len__(self):
+    return len(self.head)
+
+  def __iter__(self):
+    return itertools.chain(self.head, self.items)
+
+
+def buffered(chunks, size = 65536):
+  chunks = iter(chunks)
+  buffer = []
+  length = 0
+  while True:
+    _ = ''.join(itertools.islice(chunks, 1024))
+    if not _:
+      break
+    buffer.append(_)
+    length += len(_)
+    if length >= size:
+      yield ''.join(buffer)
+      buffer = []
+      length = 0
+  if buffer:
+    yield ''.join(buffer)
@@ -4,12 +4,17 @@
 
 
 import collections
+import copy
 import datetime
+import itertools
 import re
+import weakref
 
+from structmodel import stats
 from structmodel.utils import *
 from structmodel.exceptions import *
 from structmodel.options import AttributeOptions
+from structmodel.compiler import Source
 
 
 def comparable_dict(rhs, *args):
@@ -43,6 +48,8 @@ class AbstractStruct(collections.MutableMapping):
     raise NotImplementedError()
 
   def __getattr__(self, key):
+    if key.startswith('__') and key.endswith('__'):
+      raise AttributeError(key)
     return self.__getitem__(key)
 
   def __setattr__(self, key, value):
@@ -93,7 +100,10 @@ class AbstractStruct(collections.MutableMapping):
       self.__setitem__(item[0], item[1])
     return self
 
-  def validate(self):
+  def validate(self, strict = False):
+    raise NotImplementedError()
+
+  def copy(self, deep = False, cow = False):
     raise NotImplementedError()
 
   def json(self):
@@ -103,6 +113,7 @@ class AbstractStruct(collections.MutableMapping):
 class DataType(object):
 
   registry = {}
+  inlines = {}
 
   @classmethod
   def register(cls, type_cls):
@@ -119,11 +130,13 @@ class DataType(object):
     return type_cls
 
   @classmethod
-  def process_value(cls, opts, value):
-    if opts.required and value == None:
-      raise MissingRequiredValueError(opts.namespace, opts.name)
-    next_value = value
-    filters = opts.cache.filters
+  def inline(cls, filter_func, template):
+    cls.inlines[filter_func.__func__] = template
+
+  @classmethod
+  def filters_of(cls, opts):
+    cache = opts.fresh_cache()
+    filters = cache.filters
     if not filters:
       _ = opts.type
       if issubclass(_, AbstractStruct):
@@ -135,11 +148,79 @@ class DataType(object):
         filter_func =  builder_func(opts)
         if filter_func:
           filters.append(filter_func)
-      opts.cache.filters = filters
-    for filter_func in filters:
+      cache.filters = filters
+    return filters
+
+  @classmethod
+  def process_value(cls, opts, value):
+    if opts.required and value == None:
+      raise MissingRequiredValueError(opts.namespace, opts.name)
+    next_value = value
+    for filter_func in cls.filters_of(opts):
       next_value = filter_func(next_value, opts)
     return next_value
 
+  @classmethod
+  def setter_of(cls, opts):
+    cache = opts.fresh_cache()
+    setter = cache.setter
+    if not setter:
+      setter = cls.compile(opts)
+      cache.setter = setter
+    return setter
+
+  @classmethod
+  def column_of(cls, opts):
+    cache = opts.fresh_cache()
+    column = cache.column
+    if not column:
+      column = cls.compile(opts, True)
+      cache.column = column
+    return column
+
+  @classmethod
+  def compile(cls, opts, column = False):
+    filters = cls.filters_of(opts)
+    key = (opts.namespace, opts.name, 'column' if column else 'setter')
+    if column:
+      source = Source('column', 'values')
+      source.emit('result = []')
+      source.emit('append = result.append')
+      source.emit('for value in values:')
+    else:
+      source = Source('setter', 'value')
+    depth = 1 if column else 0
+    symbols = {
+      'opts': source.bind(opts),
+      'namespace': source.bind(key[0]),
+      'name': source.bind(key[1]),
+      'attr_type': source.bind(opts.type)
+    }
+    if opts.required:
+      source.emit('if value == None:', depth)
+      source.emit('raise %s(%s, %s)' % (
+        source.bind(MissingRequiredValueError),
+          symbols['namespace'], symbols['name']), depth + 1)
+    for filter_func in filters:
+      symbols['filter'] = source.bind(filter_func)
+      _ = getattr(filter_func, '__self__', None)
+      symbols['owner'] = source.bind(_)
+      symbols['type'] = source.bind(getattr(_, '__type__', None))
+      template = cls.inlines.get(
+        getattr(filter_func, '__func__', filter_func), None)
+      if stats.enabled:
+        template = None
+        symbols['filter'] = source.bind(stats.timed(filter_func,
+          opts.namespace, 'filter', opts.name, stats.name_of(filter_func)))
+      source.emit(template % symbols if template else \
+        'value = %(filter)s(value, %(opts)s)' % symbols, depth)
+    if column:
+      source.emit('append(value)', depth)
+      source.emit('return result')
+    else:
+      source.emit('return value')
+    return source.compile(key)
+
 
 class GenericType(DataType):
 
@@ -155,7 +236,8 @@ class ObjectType(GenericType):
 
   __type__ = object
   __builders__ = [
-    lambda opts: ObjectType.value_of,
+    lambda opts: ObjectType.lazy_value_of \
+      if opts.lazy else ObjectType.value_of,
     lambda opts: ObjectType.required \
       if opts.required else None
   ]
@@ -175,33 +257,74 @@ class ObjectType(GenericType):
       return _().assign(**x.__dict__)
     raise IncompatibleTypeError(opts.namespace, opts.name, _, type(x))
 
+  @classmethod
+  def lazy_value_of(cls, x, opts):
+    if x.__class__ is dict:
+      return x
+    return cls.value_of(x, opts)
+
 
 @DataType.register
 class StringType(GenericType):
 
   __type__ = str
   __builders__ = [
-    lambda opts: StringType.value_of,
+    lambda opts: StringType.pipeline_of(opts) \
+      if StringType.fusible(opts) else StringType.value_of,
     lambda opts: StringType.required \
-      if opts.required else None,
-    lambda opts: StringType.match \
-      if opts.pattern else None,
-    lambda opts: StringType.strip \
-      if opts.strip else None,
-    lambda opts: StringType.cleanse \
-      if opts.cleanse else None,
-    lambda opts: StringType.normalize \
-      if opts.normalize else None
+      if opts.required and not StringType.fusible(opts) else None
   ]
 
   @classmethod
   def value_of(cls, x, opts):
     return unicode(x)
 
+  @classmethod
+  def fusible(cls, opts):
+    return bool(opts.pattern or opts.strip or opts.cleanse or opts.normalize)
+
+  @classmethod
+  def pattern_of(cls, opts):
+    cache = opts.fresh_cache()
+    if not cache.pattern:
+      cache.pattern = re.compile(opts.pattern)
+    return cache.pattern
+
+  @classmethod
+  def pipeline_of(cls, opts):
+    source = Source('pipeline', 'value', 'opts')
+    key = (opts.namespace, opts.name, 'pipeline')
+    symbols = {
+      'namespace': source.bind(key[0]),
+      'name': source.bind(key[1])
+    }
+    source.emit('if value.__class__ is not unicode:\n'
+      '  value = unicode(value)')
+    if opts.required:
+      symbols['missing_value'] = source.bind(MissingRequiredValueError)
+      source.emit('if not value:\n'
+        '  raise %(missing_value)s(%(namespace)s, %(name)s)' % symbols)
+    if opts.pattern:
+      symbols['match'] = source.bind(cls.pattern_of(opts).match)
+      symbols['pattern'] = source.bind(opts.pattern)
+      symbols['mismatch'] = source.bind(PatternMismatchError)
+      source.emit('if not %(match)s(value):\n'
+        '  raise %(mismatch)s(%(namespace)s, %(name)s, %(pattern)s, value)' % \
+          symbols)
+    if opts.strip:
+      source.emit('value = value.strip()')
+    if opts.cleanse:
+      source.emit('value = %s(value)' % source.bind(cleanse_chars))
+    if opts.normalize:
+      source.emit('value = u\' \'.join(%s(value).split())' % \
+        source.bind(normalize_chars))
+    source.emit('return value')
+    return source.compile(key)
+
   @classmethod
   def match(cls, s, opts):
     pattern = opts.pattern
-    if pattern and not re.match(pattern, s):
+    if pattern and not cls.pattern_of(opts).match(s):
       raise PatternMismatchError(
         opts.namespace, opts.name, pattern, s)
     return s
@@ -292,8 +415,135 @@ class FloatType(NumericType):
   ]
 
 
+class FixedOffset(datetime.tzinfo):
+
+  instances = {}
+
+  def __init__(self, minutes):
+    self.minutes = minutes
+    self.offset = datetime.timedelta(minutes = minutes)
+    self.name = 'UTC' if not minutes else '%s%02d:%02d' % (
+      '-' if minutes < 0 else '+', abs(minutes) // 60, abs(minutes) % 60)
+
+  @classmethod
+  def of(cls, minutes):
+    _ = cls.instances.get(minutes, None)
+    if not _:
+      _ = cls.instances.setdefault(minutes, cls(minutes))
+    return _
+
+  def utcoffset(self, dt):
+    return self.offset
+
+  def dst(self, dt):
+    return None
+
+  def tzname(self, dt):
+    return self.name
+
+  def __reduce__(self):
+    return (fixed_offset, (self.minutes,))
+
+  def __repr__(self):
+    return 'FixedOffset(%d)' % self.minutes
+
+
+def fixed_offset(minutes):
+  return FixedOffset.of(minutes)
+
+
+def invalid_iso(s, kind):
+  return ValueError('%r is not a valid ISO-8601 %s' % (s, kind))
+
+
+def parse_default(s, type_cls):
+  return datetime.datetime.strptime(s, type_cls.DEFAULT_FORMAT)
+
+
+def parse_iso_date(s):
+  if len(s) != 10 or s[4] != '-' or s[7] != '-':
+    return parse_default(s, DateType).date()
+  _ = s[0:4] + s[5:7] + s[8:10]
+  if not _.isdigit():
+    return parse_default(s, DateType).date()
+  year, _ = divmod(int(_), 10000)
+  month, day = divmod(_, 100)
+  return datetime.date(year, month, day)
+
+
+def parse_iso_suffix(s, i, kind):
+  length = len(s)
+  microsecond = 0
+  tzinfo = None
+  if i < length and (s[i] == '.' or s[i] == ','):
+    j = i + 1
+    while j < length and '0' <= s[j] <= '9':
+      j += 1
+    if j == i + 1:
+      raise invalid_iso(s, kind)
+    microsecond = int((s[i + 1:j] + '00000')[:6])
+    i = j
+  if i < length:
+    _ = s[i]
+    if _ == 'Z' and i + 1 == length:
+      tzinfo = FixedOffset.of(0)
+    elif _ == '+' or _ == '-':
+      offset = s[i + 1:]
+      if len(offset) == 5 and offset[2] == ':':
+        offset = offset[0:2] + offset[3:5]
+      if len(offset) not in (2, 4) or not offset.isdigit():
+        raise invalid_iso(s, kind)
+      hours = int(offset[0:2])
+      minutes = int(offset[2:4] or 0)
+      if hours > 23 or minutes > 59:
+        raise invalid_iso(s, kind)
+      minutes += hours * 60
+      tzinfo = FixedOffset.of(-minutes if _ == '-' else minutes)
+    else:
+      raise invalid_iso(s, kind)
+  return microsecond, tzinfo
+
+
+def parse_iso_time(s):
+  if len(s) < 8 or s[2] != ':' or s[5] != ':':
+    return parse_default(s, TimeType).time()
+  _ = s[0:2] + s[3:5] + s[6:8]
+  if not _.isdigit():
+    return parse_default(s, TimeType).time()
+  hour, _ = divmod(int(_), 10000)
+  minute, second = divmod(_, 100)
+  if len(s) == 8:
+    return datetime.time(hour, minute, second)
+  return datetime.time(hour, minute, second,
+    *parse_iso_suffix(s, 8, 'time'))
+
+
+def parse_iso_datetime(s):
+  if len(s) < 19 or s[4] != '-' or s[7] != '-' or s[10] != 'T' or \
+    s[13] != ':' or s[16] != ':':
+    return parse_default(s, DateTimeType)
+  _ = s[0:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16] + s[17:19]
+  if not _.isdigit():
+    return parse_default(s, DateTimeType)
+  year, _ = divmod(int(_), 10000000000)
+  month, _ = divmod(_, 100000000)
+  day, _ = divmod(_, 1000000)
+  hour, _ = divmod(_, 10000)
+  minute, second = divmod(_, 100)
+  if len(s) == 19:
+    return datetime.datetime(year, month, day, hour, minute, second)
+  return datetime.datetime(year, month, day, hour, minute, second,
+    *parse_iso_suffix(s, 19, 'datetime'))
+
+
 class TemporalType(GenericType):
 
+  @classmethod
+  def iso_value_of(cls, x, opts):
+    if x.__class__ is str or x.__class__ is unicode:
+      return cls.parse_iso(str(x)) if x else None
+    return cls.value_of(x, opts)
+
   @classmethod
   def parse(cls, x, opts):
     return datetime.datetime.strptime(str(x),
@@ -306,15 +556,20 @@ class DateType(TemporalType):
 
   __type__ = datetime.date
   __builders__ = [
-    lambda opts: DateType.value_of,
+    lambda opts: DateType.value_of \
+      if opts.format else DateType.iso_value_of,
     lambda opts: DateType.required \
       if opts.required else None
   ]
 
+  parse_iso = staticmethod(parse_iso_date)
+
   DEFAULT_FORMAT = '%Y-%m-%d'
 
   @classmethod
   def value_of(cls, x, opts):
+    if isinstance(x, basestring) and not opts.format:
+      return parse_iso_date(str(x)) if x else None
     if isinstance(x, datetime.date):
       return x
     if isinstance(x, datetime.datetime):
@@ -329,15 +584,20 @@ class TimeType(TemporalType):
 
   __type__ = datetime.time
   __builders__ = [
-    lambda opts: TimeType.value_of,
+    lambda opts: TimeType.value_of \
+      if opts.format else TimeType.iso_value_of,
     lambda opts: TimeType.required \
       if opts.required else None
   ]
 
+  parse_iso = staticmethod(parse_iso_time)
+
   DEFAULT_FORMAT = '%H:%M:%S'
 
   @classmethod
   def value_of(cls, x, opts):
+    if isinstance(x, basestring) and not opts.format:
+      return parse_iso_time(str(x)) if x else None
     if isinstance(x, datetime.time):
       return x
     if isinstance(x, datetime.datetime):
@@ -350,15 +610,20 @@ class DateTimeType(TemporalType):
 
   __type__ = datetime.datetime
   __builders__ = [
-    lambda opts: DateTimeType.value_of,
+    lambda opts: DateTimeType.value_of \
+      if opts.format else DateTimeType.iso_value_of,
     lambda opts: DateTimeType.required \
       if opts.required else None
   ]
 
+  parse_iso = staticmethod(parse_iso_datetime)
+
   DEFAULT_FORMAT = '%Y-%m-%dT%H:%M:%S'
 
   @classmethod
   def value_of(cls, x, opts):
+    if isinstance(x, basestring) and not opts.format:
+      return parse_iso_datetime(str(x)) if x else None
     if isinstance(x, datetime.datetime):
       return x
     if isinstance(x, datetime.date):
@@ -370,10 +635,105 @@ class DateTimeType(TemporalType):
     return cls.parse(x, opts)
 
 
+def restore_list(namespace, name, items):
+  from structmodel.model import Model
+  path = name.split('[*]')
+  opts = Model.overlay(namespace).attrs[path[0]]
+  for _ in path[1:]:
+    opts = ListType.item_options(opts)
+  value = CustomList(opts)
+  list.extend(value, items)
+  return value
+
+
+ATOMIC_TYPES = frozenset([type(None), bool, int, long, float, str, unicode,
+  datetime.date, datetime.time, datetime.datetime])
+
+
+def copy_value(x, cow = False):
+  if x.__class__ in ATOMIC_TYPES:
+    return x
+  if isinstance(x, (AbstractStruct, CustomList)):
+    return x.copy(True, cow)
+  return copy.deepcopy(x)
+
+
+def link_node(node, parent, key):
+  if node.__class__ in ATOMIC_TYPES:
+    return
+  try:
+    links = node.__parents__
+  except AttributeError:
+    return
+  ref = weakref.ref(parent)
+  if links is None:
+    object.__setattr__(node, '__parents__', [(ref, key)])
+  else:
+    for _ in links:
+      if _[0] is ref and _[1] == key:
+        return
+    links[:] = [_ for _ in links if _[0]() is not None]
+    links.append((ref, key))
+  if isinstance(node, CustomList):
+    for _ in list.__iter__(node):
+      if _.__class__ not in ATOMIC_TYPES:
+        link_node(_, node, None)
+  else:
+    for key, _ in node.__dict__.iteritems():
+      if _.__class__ not in ATOMIC_TYPES:
+        link_node(_, node, key)
+
+
+def touch_parents(node):
+  for ref, key in node.__parents__ or ():
+    parent = ref()
+    if parent is not None:
+      parent.__touch__(key)
+
+
+def detach(node):
+  links = tuple(node.__parents__)
+  lent = False
+  for ref, key in links:
+    parent = ref()
+    if parent is None:
+      continue
+    if key is None:
+      if parent.__parents__:
+        detach(parent)
+    elif parent.__shared__ and key in parent.__shared__:
+      lent = lent or parent.__borrows__(key, node)
+    elif parent.__parents__ and parent.__borrows__(key, node) is False:
+      detach(parent)
+  if lent or len(node.__parents__) > len(links):
+    for ref, key in tuple(node.__parents__):
+      parent = ref()
+      if parent is not None and key is not None and \
+        parent.__borrows__(key, node):
+        parent.__unshare__(key)
+
+
 class CustomList(list):
 
+  __slots__ = ('opts', 'pending', '__parents__', '__weakref__')
+
   def __init__(self, opts):
     self.opts = opts
+    self.pending = None
+    self.__parents__ = None
+
+  def __touch__(self, key = None):
+    if self.__parents__:
+      touch_parents(self)
+
+  def __adopt__(self, items):
+    if self.__parents__ and \
+      self.opts.item_type not in ATOMIC_TYPES:
+      for _ in items:
+        link_node(_, self, None)
+
+  def __reduce__(self):
+    return (restore_list, (self.opts.namespace, self.opts.name, list(self)))
 
   def check_length(self, delta):
     _est = self.__len__() + delta
@@ -389,67 +749,212 @@ class CustomList(list):
           min_length = _min if _min else None)
 
   def process_value(self, value):
-    item_opts = self.opts.cache.item
-    if not item_opts:
-      raise UnexpectedError(
-        '%s: invalid list setup' % qname(
-          self.opts.namespace, self.opts.name))
-    return DataType.process_value(item_opts, value)
+    return self.setter()(value)
+
+  def setter(self):
+    return DataType.setter_of(ListType.item_options(self.opts))
+
+  def coerce(self):
+    return self
+
+  def copy(self, deep = False, cow = False):
+    _ = self.__class__(self.opts)
+    items = list.__iter__(self)
+    list.extend(_, [copy_value(x, cow) for x in items] \
+      if deep or cow else items)
+    if self.pending is not None:
+      _.pending = bytearray(self.pending)
+    return _
 
 
   def __add__(self, x):
     return super(CustomList, self). \
-      __add__(map(self.process_value, x))
+      __add__(map(self.setter(), x))
 
   def __iadd__(self, x):
     self.check_length(len(x))
-    return super(CustomList, self). \
-      __iadd__(map(self.process_value, x))
+    x = map(self.setter(), x)
+    if self.__parents__:
+      detach(self)
+    _ = super(CustomList, self).__iadd__(x)
+    self.__adopt__(x)
+    self.__touch__()
+    return _
 
   def __imul__(self, n):
     self.check_length(len(self) * (n - 1))
-    return super(CustomList, self).__imul__(n)
+    if self.__parents__:
+      detach(self)
+    _ = super(CustomList, self).__imul__(n)
+    self.__touch__()
+    return _
 
   def __setitem__(self, i, y):
-    return super(CustomList, self). \
-      __setitem__(i, self.process_value(y))
+    y = self.process_value(y)
+    if self.__parents__:
+      detach(self)
+    super(CustomList, self).__setitem__(i, y)
+    self.__adopt__((y,))
+    self.__touch__()
 
   def __setslice__(self, i, j, x):
     self.check_length(i - min(len(self), j) + len(x))
-    return super(CustomList, self). \
-      __setslice__(i, j, map(self.process_value, x))
+    x = map(self.setter(), x)
+    if self.__parents__:
+      detach(self)
+    super(CustomList, self).__setslice__(i, j, x)
+    self.__adopt__(x)
+    self.__touch__()
 
   def __delitem__(self, i):
     self.check_length(-1)
+    if self.__parents__:
+      detach(self)
     super(CustomList, self).__delitem__(i)
+    self.__touch__()
 
   def __delslice__(self, i, j):
     self.check_length(i - j)
+    if self.__parents__:
+      detach(self)
     super(CustomList, self).__delslice__(i, j)
+    self.__touch__()
 
   def append(self, x):
     self.check_length(1)
-    super(CustomList, self). \
-      append(self.process_value(x))
+    x = self.process_value(x)
+    if self.__parents__:
+      detach(self)
+    super(CustomList, self).append(x)
+    self.__adopt__((x,))
+    self.__touch__()
 
   def extend(self, x):
     self.check_length(len(x))
-    super(CustomList, self). \
-      extend(map(self.process_value, x))
+    x = map(self.setter(), x)
+    if self.__parents__:
+      detach(self)
+    super(CustomList, self).extend(x)
+    self.__adopt__(x)
+    self.__touch__()
 
   def insert(self, i, x):
     self.check_length(1)
-    super(CustomList, self). \
-      insert(i, self.process_value(x))
+    x = self.process_value(x)
+    if self.__parents__:
+      detach(self)
+    super(CustomList, self).insert(i, x)
+    self.__adopt__((x,))
+    self.__touch__()
 
   def pop(self, *args):
     self.check_length(-1)
-    return super(CustomList, self).pop(*args)
+    if self.__parents__:
+      detach(self)
+    _ = super(CustomList, self).pop(*args)
+    self.__touch__()
+    return _
 
   def remove(self, x):
     if x in self:
       self.check_length(-1)
+    if self.__parents__:
+      detach(self)
     super(CustomList, self).remove(x)
+    self.__touch__()
+
+  def reverse(self):
+    if self.__parents__:
+      detach(self)
+    super(CustomList, self).reverse()
+    self.__touch__()
+
+  def sort(self, *args, **kwargs):
+    if self.__parents__:
+      detach(self)
+    super(CustomList, self).sort(*args, **kwargs)
+    self.__touch__()
+
+
+class DeferredList(CustomList):
+
+  __slots__ = ()
+
+  def defer(self, items):
+    list.extend(self, items)
+    self.pending = bytearray('\x01') * len(self)
+    return self.settle() if not self.pending else self
+
+  def settle(self):
+    self.pending = None
+    self.__class__ = CustomList
+    return self
+
+  def coerce(self):
+    setter = self.setter()
+    values = [setter(value) if flag else value \
+      for value, flag in itertools.izip(list.__iter__(self), self.pending)]
+    list.__setslice__(self, 0, len(self), values)
+    self.__adopt__(values)
+    return self.settle()
+
+  def __getitem__(self, i):
+    if isinstance(i, slice):
+      return self.coerce().__getitem__(i)
+    value = list.__getitem__(self, i)
+    i = i if i >= 0 else i + len(self)
+    if self.pending[i]:
+      value = self.setter()(value)
+      list.__setitem__(self, i, value)
+      self.pending[i] = 0
+      self.__adopt__((value,))
+    return value
+
+  def __iter__(self):
+    i = 0
+    while i < len(self):
+      yield self[i]
+      i += 1
+    if self.__class__ is DeferredList and 1 not in self.pending:
+      self.settle()
+
+  def __setitem__(self, i, y):
+    if isinstance(i, slice):
+      return self.coerce().__setitem__(i, y)
+    y = self.process_value(y)
+    if self.__parents__:
+      detach(self)
+    list.__setitem__(self, i, y)
+    self.pending[i if i >= 0 else i + len(self)] = 0
+    self.__adopt__((y,))
+    self.__touch__()
+
+  def append(self, x):
+    super(DeferredList, self).append(x)
+    self.pending.append(0)
+
+  def extend(self, x):
+    super(DeferredList, self).extend(x)
+    self.pending.extend(bytearray(len(self) - len(self.pending)))
+
+  def __iadd__(self, x):
+    self.extend(x)
+    return self
+
+
+def coercing(name):
+  def method(self, *args):
+    return getattr(self.coerce(), name)(*args)
+  method.__name__ = name
+  return method
+
+
+for _ in ('__add__', '__contains__', '__delitem__', '__delslice__', '__eq__',
+  '__ge__', '__getslice__', '__gt__', '__imul__', '__le__', '__lt__',
+  '__mul__', '__ne__', '__reduce__', '__repr__', '__reversed__', '__rmul__',
+  '__setslice__', '__str__', 'count', 'index', 'insert', 'pop', 'remove',
+  'reverse', 'sort'):
+  setattr(DeferredList, _, coercing(_))
 
 
 @DataType.register
@@ -463,13 +968,57 @@ class ListType(GenericType):
   ]
 
   @classmethod
-  def value_of(cls, x, opts):
-    if not opts.cache.item:
-      opts.cache.item = AttributeOptions(opts.namespace,
+  def item_options(cls, opts):
+    cache = opts.fresh_cache()
+    if not cache.item:
+      cache.item = AttributeOptions(opts.namespace,
         opts.name + '[*]', **{key[5:]: opts[key]  \
           for key in opts if key.startswith('item_')})
-    value = CustomList(opts)
+    return cache.item
+
+  @classmethod
+  def value_of(cls, x, opts):
+    cls.item_options(opts)
     if not hasattr(x, '__iter__') or not hasattr(x, '__len__'):
       raise NonIterableTypeError(opts.namespace, opts.name, type(x))
+    if opts.lazy:
+      value = DeferredList(opts)
+      value.check_length(len(x))
+      return value.defer(x)
+    value = CustomList(opts)
     value.extend(x)
     return value
+
+
+DataType.inline(GenericType.required,
+  'if not value:\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(NumericType.required,
+  'if value == None:\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(ObjectType.value_of,
+  'if value.__class__ is not %(attr_type)s:\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(ObjectType.lazy_value_of,
+  'if value.__class__ is not %(attr_type)s and value.__class__ is not dict:\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(StringType.value_of,
+  'value = unicode(value)')
+DataType.inline(BooleanType.value_of,
+  'if value is not True and value is not False:\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(NumericType.value_of,
+  'if not isinstance(value, %(type)s):\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(DateType.value_of,
+  'if not isinstance(value, %(type)s):\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(TimeType.value_of,
+  'if not isinstance(value, %(type)s):\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(DateTimeType.value_of,
+  'if not isinstance(value, %(type)s):\n'
+  '  value = %(filter)s(value, %(opts)s)')
+DataType.inline(TemporalType.iso_value_of,
+  'if not isinstance(value, %(type)s):\n'
+  '  value = %(filter)s(value, %(opts)s)')
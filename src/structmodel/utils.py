@@ -3,6 +3,9 @@
 #
 
 
+import re
+
+
 def qname(*parts):
   result = ''
   for part in parts:
@@ -31,3 +34,47 @@ def is_numeric(x):
   return reduce(
     lambda r, t: r or isinstance(x, t), (int, long, float),
       False)
+
+
+def translation_table(*mappings):
+  table = {}
+  for codes, replacement in mappings:
+    for code in codes:
+      table[code] = replacement
+  return table
+
+
+CLEANSE_TABLE = translation_table(
+  (range(0x00, 0x20) + range(0x7f, 0xa0), None),
+  ((0x09, 0x0a, 0x0b, 0x0c, 0x0d, 0x1c, 0x1d, 0x1e, 0x1f, 0x85), u' '),
+  ([0xad, 0xfeff] + range(0x200b, 0x2010) + range(0x202a, 0x202f) + \
+    range(0x2060, 0x2065) + range(0x206a, 0x2070) + \
+      range(0xfff9, 0xfffc), None))
+
+NORMALIZE_TABLE = translation_table(
+  ([0xa0, 0x1680, 0x180e, 0x202f, 0x205f, 0x3000] + \
+    range(0x2000, 0x200b), u' '),
+  ((0x2018, 0x2019, 0x201a, 0x201b, 0x2032), u'\''),
+  ((0x201c, 0x201d, 0x201e, 0x201f, 0x2033), u'"'),
+  (range(0x2010, 0x2016) + [0x2212], u'-'),
+  ((0x2026,), u'...'))
+
+
+def translator_of(table):
+  pattern = re.compile(u'[%s]' % u''.join(
+    re.escape(unichr(_)) for _ in sorted(table)), re.UNICODE)
+  replace = lambda m: table[ord(m.group())] or u''
+  return lambda s: pattern.sub(replace, s)
+
+
+cleanse_chars = translator_of(CLEANSE_TABLE)
+normalize_chars = translator_of(NORMALIZE_TABLE)
+
+
+def cleanse_str(s):
+  return cleanse_chars(s if isinstance(s, unicode) else unicode(s))
+
+
+def normalize_str(s):
+  return u' '.join(normalize_chars(
+    s if isinstance(s, unicode) else unicode(s)).split())
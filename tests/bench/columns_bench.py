@@ -0,0 +1,63 @@
+#
+# Copyright
+#
+
+
+import os
+import sys
+import tempfile
+import time
+
+from structmodel.model import *
+
+
+@Model.define('day', type = datetime.date)
+@Model.define('tags', type = list, item_type = int)
+@Model.define('score', type = float)
+@Model.define('count', type = int, required = True)
+@Model.define('name')
+@Model.declare('ColumnsRow')
+class Row(Struct):
+  pass
+
+
+def elapsed(func, *args):
+  start = time.time()
+  func(*args)
+  return time.time() - start
+
+
+def main(count):
+  structs = [Row(name = 'row-%d' % i, count = i, score = i * 0.5,
+    tags = [i, i + 1], day = datetime.date(2000, 1, 1 + i % 28)) \
+      for i in xrange(count)]
+  directory = tempfile.mkdtemp()
+  jsonl = os.path.join(directory, 'rows.jsonl')
+  path = os.path.join(directory, 'rows.columns')
+  try:
+    Model.write_jsonl(structs, jsonl)
+    write = elapsed(Model.write_columns, Row, structs, path)
+    load = elapsed(lambda: list(Model.read_jsonl(Row, jsonl)))
+    start = time.time()
+    store = Model.open_columns(Row, path)
+    startup = time.time() - start
+    scan = elapsed(lambda: sum(row['count'] for row in store))
+    column = elapsed(lambda: sum(store.column('count')))
+    materialize = elapsed(lambda: [_.materialize() for _ in store])
+    store.close()
+    print 'write columns   %8.2fus/row' % (write / count * 1e6)
+    print 'read_jsonl      %8.2fms' % (load * 1e3)
+    print 'open columns    %8.2fms' % (startup * 1e3)
+    print 'scan one attr   %8.2fus/row' % (scan / count * 1e6)
+    print 'column()        %8.2fus/row' % (column / count * 1e6)
+    print 'materialize     %8.2fus/row' % (materialize / count * 1e6)
+    print 'file size       %8d vs %d bytes (jsonl)' % (
+      os.path.getsize(path), os.path.getsize(jsonl))
+  finally:
+    for _ in os.listdir(directory):
+      os.remove(os.path.join(directory, _))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,73 @@
+#
+# Copyright
+#
+
+
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+from structmodel.model import *
+
+
+@Model.define('tags', type = list, item_type = int)
+@Model.define('score', type = float)
+@Model.define('count', type = int, required = True)
+@Model.define('name')
+@Model.declare('JsonlRow')
+class Row(Struct):
+  pass
+
+
+def naive_write(structs, path):
+  fp = gzip.open(path, 'wb') if path.endswith('.gz') else open(path, 'wb')
+  try:
+    for struct in structs:
+      fp.write(json.dumps(jsonable(struct),
+        separators = (',', ':')) + '\n')
+  finally:
+    fp.close()
+
+
+def naive_read(path):
+  fp = gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+  try:
+    for line in fp:
+      if line.strip():
+        yield Model.loads(Row, line).validate()
+  finally:
+    fp.close()
+
+
+def elapsed(func, *args):
+  start = time.time()
+  func(*args)
+  return time.time() - start
+
+
+def main(count):
+  structs = [Row(name = 'row-%d' % i, count = i, score = i * 0.5,
+    tags = [i, i + 1]) for i in xrange(count)]
+  directory = tempfile.mkdtemp()
+  try:
+    print '%-14s %10s %10s %10s %10s' % ('', 'write', 'naive', 'read',
+      'naive')
+    for suffix in ('.jsonl', '.jsonl.gz'):
+      path = os.path.join(directory, 'rows' + suffix)
+      write = elapsed(Model.write_jsonl, structs, path)
+      read = elapsed(lambda: sum(1 for _ in Model.read_jsonl(Row, path)))
+      naive_write_time = elapsed(naive_write, structs, path)
+      naive_read_time = elapsed(lambda: sum(1 for _ in naive_read(path)))
+      print '%-14s %8.2fus %8.2fus %8.2fus %8.2fus' % (suffix,
+        write / count * 1e6, naive_write_time / count * 1e6,
+          read / count * 1e6, naive_read_time / count * 1e6)
+  finally:
+    for _ in os.listdir(directory):
+      os.remove(os.path.join(directory, _))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
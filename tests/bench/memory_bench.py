@@ -0,0 +1,67 @@
+#
+# Copyright
+#
+
+
+import gc
+import multiprocessing
+import resource
+import sys
+
+from structmodel.model import *
+
+
+def resident_size():
+  try:
+    with open('/proc/self/statm') as f:
+      return int(f.read().split()[1]) * resource.getpagesize()
+  except IOError:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def declare(compact):
+  @Model.define('tags', type = list, item_type = int)
+  @Model.define('score', type = float)
+  @Model.define('count', type = int)
+  @Model.define('name')
+  @Model.declare('Row%s' % ('Compact' if compact else 'Dict'),
+    compact = compact)
+  class Row(Struct):
+    pass
+  return Row
+
+
+def rows_of(count):
+  return [{'name': 'row-%d' % i, 'count': i, 'score': i * 0.5,
+    'tags': [i, i + 1]} for i in xrange(count)]
+
+
+def measure(args):
+  compact, count = args
+  struct_cls = declare(compact)
+  rows = rows_of(count)
+  gc.collect()
+  before = resident_size()
+  structs = Model.build_many(struct_cls, rows)
+  gc.collect()
+  after = resident_size()
+  _ = structs[0]
+  footprint = sys.getsizeof(_) + sys.getsizeof(
+    _.__values__ if compact else _.__dict__)
+  return footprint, (after - before) / float(count)
+
+
+def main(count):
+  pool = multiprocessing.Pool(1, maxtasksperchild = 1)
+  try:
+    for compact in (False, True):
+      footprint, resident = pool.apply(measure, ((compact, count),))
+      print '%-8s %6d bytes/struct (storage) %8.1f bytes/struct (rss)' % (
+        'compact' if compact else 'dict', footprint, resident)
+  finally:
+    pool.close()
+    pool.join()
+
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
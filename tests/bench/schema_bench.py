@@ -0,0 +1,102 @@
+#
+# Copyright
+#
+
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+TYPES = ['int', 'str', 'float', 'list', 'date', 'datetime']
+
+
+def spec_of(count):
+  spec = {}
+  for i in xrange(count):
+    attrs = {}
+    for j in xrange(12):
+      opts = {'type': TYPES[j % len(TYPES)], 'required': j % 4 == 0}
+      if opts['type'] == 'list':
+        opts['item_type'] = 'int' if i % 2 else 'Struct%d' % ((i + 1) % count)
+        opts['max_length'] = i % 7 + 1
+      elif opts['type'] == 'str':
+        opts['pattern'] = '^[a-z]{%d}' % (i % 5 + 1)
+        opts['strip'] = bool(i % 2)
+      attrs['attr%d' % j] = opts
+    spec['Struct%d' % i] = {'attributes': attrs,
+      'options': {'open': bool(i % 4 == 0)}}
+  return spec
+
+
+def row_of(i):
+  row = {}
+  for j in xrange(12):
+    kind = TYPES[j % len(TYPES)]
+    if kind in ('int', 'float'):
+      row['attr%d' % j] = j
+    elif kind == 'str':
+      row['attr%d' % j] = 'abcdef'
+    elif kind == 'list':
+      row['attr%d' % j] = [1] if i % 2 else []
+    elif kind == 'date':
+      row['attr%d' % j] = '2000-01-02'
+    elif kind == 'datetime':
+      row['attr%d' % j] = '2000-01-02T03:04:05'
+  return row
+
+
+def first_use(spec):
+  from structmodel.model import Model
+  start = time.time()
+  for name in sorted(spec):
+    struct_cls = Model.overlay(name).struct_cls
+    struct_cls(**row_of(int(name[6:]))).validate().json()
+  return time.time() - start
+
+
+def startup(args):
+  mode, spec, path, warm_up = args
+  start = time.time()
+  from structmodel.model import Model, Struct
+  if mode == 'decorators':
+    from structmodel import schema
+    structs = {}
+    for name in sorted(spec):
+      structs[name] = Model.declare(name, **spec[name]['options'])(
+        type(str(name), (Struct,), {}))
+    for name in sorted(spec):
+      for attr_name, attr_opts in sorted(spec[name]['attributes'].items()):
+        Model.define(attr_name, **schema.resolve_types(
+          schema.options_of(attr_opts), structs))(structs[name])
+  else:
+    Model.load(path if mode == 'file' else spec, warm_up = warm_up)
+  return time.time() - start, first_use(spec)
+
+
+def main(count):
+  spec = spec_of(count)
+  fd, path = tempfile.mkstemp('.json')
+  os.close(fd)
+  with open(path, 'wb') as fp:
+    json.dump(spec, fp)
+  pool = multiprocessing.Pool(1, maxtasksperchild = 1)
+  try:
+    print '%-24s %10s %10s' % ('', 'startup', 'first use')
+    for label, mode, warm_up in (
+      ('decorators', 'decorators', False),
+      ('load', 'load', False),
+      ('load, warm', 'load', True),
+      ('load file', 'file', False),
+      ('load file, warm', 'file', True)):
+      _ = pool.apply(startup, ((mode, spec, path, warm_up),))
+      print '%-24s %8.1fms %8.1fms' % (label, _[0] * 1e3, _[1] * 1e3)
+  finally:
+    pool.close()
+    pool.join()
+    os.remove(path)
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
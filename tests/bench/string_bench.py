@@ -0,0 +1,69 @@
+#
+# Copyright
+#
+
+
+import itertools
+import re
+import timeit
+
+from structmodel.options import AttributeOptions
+from structmodel.types import DataType, StringType
+from structmodel.utils import cleanse_str, normalize_str
+
+
+STEPS = ('required', 'pattern', 'strip', 'cleanse', 'normalize')
+
+VALUES = [u'  value \u2019%d\xa0 with\ttext\x00 ' % i for i in xrange(1000)]
+
+
+def options_of(steps, pattern = r'^\s*value'):
+  opts = dict((step, True) for step in steps)
+  if 'pattern' in steps:
+    opts['pattern'] = pattern
+  return AttributeOptions('Bench', 'value', **opts)
+
+
+def chained(opts):
+  filters = [unicode]
+  if opts.required:
+    filters.append(lambda s: StringType.required(s, opts))
+  if opts.pattern:
+    filters.append(lambda s: s if re.match(opts.pattern, s) else None)
+  if opts.strip:
+    filters.append(lambda s: s.strip())
+  if opts.cleanse:
+    filters.append(cleanse_str)
+  if opts.normalize:
+    filters.append(normalize_str)
+  def setter(value):
+    for filter_func in filters:
+      value = filter_func(value)
+    return value
+  return setter
+
+
+def measure(setter, values, number = 20):
+  return min(timeit.repeat(lambda: map(setter, values),
+    number = number, repeat = 3)) / number / len(values) * 1e6
+
+
+def main():
+  print '%-40s %10s %10s' % ('steps', 'chained', 'fused')
+  for count in xrange(1, len(STEPS) + 1):
+    for steps in itertools.combinations(STEPS, count):
+      opts = options_of(steps)
+      print '%-40s %8.2fus %8.2fus' % ('+'.join(steps),
+        measure(chained(opts), VALUES),
+          measure(DataType.setter_of(opts), VALUES))
+  patterns = [r'^\s*value %d|^\s*value' % i for i in xrange(500)]
+  chains = [chained(options_of(('pattern',), _)) for _ in patterns]
+  setters = [DataType.setter_of(options_of(('pattern',), _)) \
+    for _ in patterns]
+  print '%-40s %8.2fus %8.2fus' % ('500 distinct patterns',
+    measure(lambda v: [_(v) for _ in chains], VALUES[:50], 2) / 500,
+    measure(lambda v: [_(v) for _ in setters], VALUES[:50], 2) / 500)
+
+
+if __name__ == '__main__':
+  main()
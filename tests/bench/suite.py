@@ -0,0 +1,236 @@
+#
+# Copyright
+#
+
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+from structmodel.model import *
+from structmodel.options import AttributeOptions
+from structmodel.types import DataType
+
+
+@Model.define('day', type = datetime.date)
+@Model.define('flag', type = bool)
+@Model.define('score', type = float)
+@Model.define('count', type = int, required = True)
+@Model.define('name')
+@Model.declare('BenchFlat')
+class Flat(Struct):
+  pass
+
+
+@Model.define('items', type = list, item_type = Flat)
+@Model.define('child', type = Flat)
+@Model.define('name')
+@Model.declare('BenchNested')
+class Nested(Struct):
+  pass
+
+
+@Model.define('scores', type = list, item_type = float)
+@Model.define('tags', type = list, item_type = int)
+@Model.declare('BenchLists')
+class Lists(Struct):
+  pass
+
+
+@Model.define('count', type = int)
+@Model.define('name')
+@Model.declare('BenchOpen', open = True)
+class Open(Struct):
+  pass
+
+
+FLAT = {'name': 'row', 'count': 7, 'score': 0.5, 'flag': True,
+  'day': '2000-01-02'}
+
+NESTED = {'name': 'parent', 'child': FLAT, 'items': [FLAT] * 5}
+
+LISTS = {'tags': range(100), 'scores': [_ * 0.5 for _ in xrange(100)]}
+
+OPEN = dict([('name', 'row'), ('count', 7)] + \
+  [('extra%d' % _, _) for _ in xrange(10)])
+
+TEMPORAL = {
+  datetime.date: '2000-01-02',
+  datetime.time: '03:04:05.000006',
+  datetime.datetime: '2000-01-02T03:04:05.000006+01:30'
+}
+
+
+def setter_of(attr_type):
+  return DataType.setter_of(AttributeOptions('Bench', 'value',
+    type = attr_type))
+
+
+def cases():
+  flat = Flat(**FLAT).validate()
+  nested = Nested(**NESTED).validate()
+  lists = Lists(**LISTS).validate()
+  opened = Open(**OPEN).validate()
+  invalid = Flat(**FLAT)
+  del invalid.__dict__['count']
+  flat_json = flat.json()
+  nested_json = nested.json()
+  tags = range(100)
+  def setitem():
+    flat['count'] = 8
+  def validate_dirty():
+    flat['count'] = 8
+    return flat.validate()
+  def validate_invalid():
+    try:
+      invalid.validate(True)
+    except FrameworkException:
+      pass
+  def extend():
+    _ = lists.tags
+    del _[:]
+    _.extend(tags)
+  yield 'flat.construct', lambda: Flat(**FLAT)
+  yield 'flat.setitem', setitem
+  yield 'flat.assign', lambda: flat.assign(**FLAT)
+  yield 'flat.validate', validate_dirty
+  yield 'flat.validate_strict', lambda: flat.validate(True)
+  yield 'flat.violations', flat.violations
+  yield 'flat.violations_invalid', invalid.violations
+  yield 'flat.validate_invalid', validate_invalid
+  yield 'flat.to_json', flat.json
+  yield 'flat.from_json', lambda: Flat.from_json(flat_json)
+  yield 'flat.to_bytes', flat.to_bytes
+  yield 'nested.construct', lambda: Nested(**NESTED)
+  yield 'nested.validate_strict', lambda: nested.validate(True)
+  yield 'nested.to_json', nested.json
+  yield 'nested.from_json', lambda: Nested.from_json(nested_json)
+  yield 'lists.construct', lambda: Lists(**LISTS)
+  yield 'lists.extend', extend
+  yield 'lists.validate_strict', lambda: lists.validate(True)
+  yield 'lists.to_json', lists.json
+  yield 'open.construct', lambda: Open(**OPEN)
+  yield 'open.assign', lambda: opened.assign(**OPEN)
+  yield 'open.to_json', opened.json
+  for attr_type, value in sorted(TEMPORAL.items()):
+    yield 'temporal.%s' % attr_type.__name__, \
+      lambda setter = setter_of(attr_type), value = value: setter(value)
+
+
+def timed(func, number):
+  start = time.time()
+  for _ in xrange(number):
+    func()
+  return time.time() - start
+
+
+def allocations(func, number):
+  results = []
+  append = results.append
+  enabled = gc.isenabled()
+  gc.collect()
+  gc.disable()
+  try:
+    before = gc.get_count()[0]
+    for _ in xrange(number):
+      append(func())
+    return (gc.get_count()[0] - before) / float(number)
+  finally:
+    del results[:]
+    if enabled:
+      gc.enable()
+
+
+def measure(func, duration = 0.2, repeat = 3):
+  number = 1
+  while True:
+    _ = timed(func, number)
+    if _ >= duration / 10:
+      break
+    number *= 10
+  number = max(1, int(number * duration / 10 / max(_, 1e-9)))
+  best = min(timed(func, number) for _ in xrange(repeat))
+  return {
+    'ops': number / best if best else float('inf'),
+    'allocations': allocations(func, min(number, 10000))
+  }
+
+
+def run(selected = None, duration = 0.2):
+  results = {}
+  for name, func in cases():
+    if selected and not any(name.startswith(_) for _ in selected):
+      continue
+    results[name] = measure(func, duration)
+  return {
+    'python': platform.python_version(),
+    'machine': platform.machine(),
+    'timestamp': time.time(),
+    'results': results
+  }
+
+
+def compare(current, baseline, threshold = 0.1):
+  regressions = []
+  for name, result in sorted(current['results'].iteritems()):
+    expected = baseline['results'].get(name, None)
+    if not expected:
+      continue
+    ratio = result['ops'] / expected['ops']
+    if ratio < 1 - threshold:
+      regressions.append((name, 'ops', expected['ops'], result['ops']))
+    if result['allocations'] > expected['allocations'] * (1 + threshold) + \
+      0.5:
+      regressions.append((name, 'allocations', expected['allocations'],
+        result['allocations']))
+  return regressions
+
+
+def report(current, baseline = None):
+  print '%-26s %14s %10s %10s' % ('case', 'ops/sec', 'allocs/op', 'change')
+  for name, result in sorted(current['results'].iteritems()):
+    expected = baseline['results'].get(name, None) if baseline else None
+    print '%-26s %14.1f %10.2f %10s' % (name, result['ops'],
+      result['allocations'], '%+.1f%%' % (
+        (result['ops'] / expected['ops'] - 1) * 100) if expected else '')
+
+
+def main(argv = None):
+  parser = argparse.ArgumentParser(description = 'StructModel benchmarks')
+  parser.add_argument('cases', nargs = '*',
+    help = 'case name prefixes to run, e.g. flat nested.to_json')
+  parser.add_argument('--output', help = 'write results as JSON')
+  parser.add_argument('--baseline', help = 'compare against stored results')
+  parser.add_argument('--threshold', type = float, default = 0.1,
+    help = 'relative slowdown flagged as a regression')
+  parser.add_argument('--duration', type = float, default = 0.2,
+    help = 'seconds spent per timing repeat')
+  parser.add_argument('--save-baseline', action = 'store_true',
+    help = 'store the results as the new baseline')
+  args = parser.parse_args(argv)
+  current = run(args.cases, args.duration)
+  baseline = None
+  if args.baseline and os.path.exists(args.baseline) and \
+    not args.save_baseline:
+    with open(args.baseline) as fp:
+      baseline = json.load(fp)
+  report(current, baseline)
+  for path in (args.output, args.baseline if args.save_baseline else None):
+    if path:
+      with open(path, 'w') as fp:
+        json.dump(current, fp, indent = 2, sort_keys = True)
+  if not baseline:
+    return 0
+  regressions = compare(current, baseline, args.threshold)
+  for name, metric, expected, found in regressions:
+    print 'REGRESSION %s %s: %.2f -> %.2f' % (name, metric, expected, found)
+  return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,80 @@
+#
+# Copyright
+#
+
+
+import unittest
+
+from structmodel.aio import *
+from structmodel.model import *
+
+try:
+  import trollius
+except ImportError:
+  trollius = None
+
+
+@Model.define('count', type = int, required = True)
+@Model.declare('AioRow')
+class Row(Struct):
+  pass
+
+
+class LineBufferTests(unittest.TestCase):
+
+  def test_feed(self):
+    buffer = LineBuffer()
+    self.assertEquals(buffer.feed('{"a"'), [])
+    self.assertEquals(buffer.feed(': 1}\n{"b": 2}\n{'),
+      ['{"a": 1}', '{"b": 2}'])
+    self.assertEquals(buffer.feed('}'), [])
+    self.assertEquals(buffer.close(), ['{}'])
+    self.assertEquals(buffer.close(), [])
+
+
+@unittest.skipUnless(trollius, 'trollius is not installed')
+class JsonlStreamTests(unittest.TestCase):
+
+  def setUp(self):
+    self.loop = trollius.new_event_loop()
+
+  def tearDown(self):
+    self.loop.close()
+
+  def reader_of(self, text):
+    reader = trollius.StreamReader(loop = self.loop)
+    reader.feed_data(text)
+    reader.feed_eof()
+    return reader
+
+  def collect(self, stream):
+    def run():
+      structs = []
+      while True:
+        batch = yield trollius.From(stream.next_batch())
+        if batch is None:
+          raise trollius.Return(structs)
+        structs.extend(batch)
+    return self.loop.run_until_complete(run())
+
+  def test_batches(self):
+    text = ''.join('{"count": %d}\n' % i for i in xrange(25))
+    stream = Model.aiter_jsonl(Row, self.reader_of(text), batch_size = 10,
+      loop = self.loop)
+    self.assertEquals([_.count for _ in self.collect(stream)], range(25))
+
+  def test_errors(self):
+    text = '{"count": 1}\n{}\n\n{"count": "x"}\n{"count": 4}'
+    errors = []
+    stream = Model.aiter_jsonl(Row, self.reader_of(text), errors = errors,
+      loop = self.loop)
+    self.assertEquals([_.count for _ in self.collect(stream)], [1, 4])
+    self.assertEquals([_[0] for _ in errors], [1, 3])
+    stream = Model.aiter_jsonl(Row, self.reader_of(text), loop = self.loop)
+    self.assertRaises(RowProcessingError, self.collect, stream)
+
+  def test_next_struct(self):
+    stream = Model.aiter_jsonl(Row, self.reader_of('{"count": 1}\n'),
+      loop = self.loop)
+    self.assertEquals(self.loop.run_until_complete(stream.next_struct()).count, 1)
+    self.assertEquals(self.loop.run_until_complete(stream.next_struct()), None)
@@ -0,0 +1,69 @@
+#
+# Copyright
+#
+
+
+import unittest
+import datetime
+
+from structmodel.codec import *
+from structmodel.exceptions import InvalidValueError
+from structmodel.options import AttributeOptions
+from structmodel.types import FixedOffset
+
+
+def round_trip(opts, value):
+  parts = []
+  packer_of(opts)(value, parts)
+  data = ''.join(parts)
+  value, offset = unpacker_of(opts)(memoryview(data), 0)
+  return value, offset == len(data)
+
+
+class CodecTests(unittest.TestCase):
+
+  def test_mask(self):
+    self.assertEquals(mask_width(3), 1)
+    self.assertEquals(mask_width(24), 4)
+    self.assertEquals(mask_width(80), 10)
+    mask = (1 << 79) | 5
+    self.assertEquals(unpack_mask(memoryview(pack_mask(mask, 10)), 0, 10),
+      (mask,))
+
+  def test_temporal(self):
+    for attr_type, value in (
+      (datetime.date, datetime.date(1, 1, 1)),
+      (datetime.time, datetime.time(23, 59, 59, 999999)),
+      (datetime.time, datetime.time(1, 2, 3, 4, FixedOffset.of(-90))),
+      (datetime.datetime, datetime.datetime(9999, 12, 31, 23, 59, 59)),
+      (datetime.datetime, datetime.datetime(2000, 1, 1, 0, 0, 0, 1,
+        FixedOffset.of(330)))):
+      self.assertEquals(round_trip(
+        AttributeOptions('Foo', 'bar', type = attr_type), value), (value, True))
+
+  def test_list(self):
+    opts = AttributeOptions('Foo', 'bar', type = list, item_type = int)
+    self.assertEquals(round_trip(opts, range(100)), (range(100), True))
+    self.assertEquals(round_trip(opts, [1, None, 3]), ([1, None, 3], True))
+    self.assertEquals(round_trip(opts, []), ([], True))
+    opts = AttributeOptions('Foo', 'bar', type = list, item_type = list)
+    self.assertEquals(round_trip(opts, [[u'a'], None, []]),
+      ([[u'a'], None, []], True))
+
+  def test_long(self):
+    opts = AttributeOptions('Foo', 'bar', type = long)
+    for value in (0L, 1L << 63, -(1L << 80), 12345678901234567890123L):
+      self.assertEquals(round_trip(opts, value), (value, True))
+    opts = AttributeOptions('Foo', 'bar', type = list, item_type = long)
+    self.assertEquals(round_trip(opts, [1L << 64, None, -1L]),
+      ([1L << 64, None, -1L], True))
+    opts = AttributeOptions('Foo', 'bar', type = int)
+    self.assertEquals(round_trip(opts, INT_MIN), (INT_MIN, True))
+    try:
+      packer_of(opts)(1 << 63, [])
+      self.assertFalse(True)
+    except InvalidValueError, e:
+      self.assertEquals(e.parameters, {'attribute': 'Foo.bar',
+        'validation': 'int64', 'value': 1 << 63})
+    opts = AttributeOptions('Foo', 'bar', type = list, item_type = int)
+    self.assertRaises(InvalidValueError, packer_of(opts), [1, 1 << 64], [])
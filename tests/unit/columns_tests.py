@@ -0,0 +1,47 @@
+#
+# Copyright
+#
+
+
+import unittest
+import struct
+
+from structmodel.columns import *
+from structmodel.exceptions import InvalidValueError
+from structmodel.options import AttributeOptions
+
+
+class ColumnWriterTests(unittest.TestCase):
+
+  def test_fixed(self):
+    writer = ColumnWriter('foo', AttributeOptions('Foo', 'foo', type = int))
+    for _ in (1, None, MISSING, -2):
+      writer.append(_)
+    sections = dict(writer.sections())
+    self.assertEquals(sections['status'], '\x01\x02\x00\x01')
+    self.assertEquals(struct.unpack('<4q', sections['values']), (1, 0, 0, -2))
+
+  def test_heap(self):
+    writer = ColumnWriter('foo', AttributeOptions('Foo', 'foo', type = str))
+    for _ in (u'\xe9', MISSING, u'', u'ab'):
+      writer.append(_)
+    sections = dict(writer.sections())
+    self.assertEquals(struct.unpack('<5Q', sections['offsets']),
+      (0, 2, 2, 2, 4))
+    self.assertEquals(sections['heap'], '\xc3\xa9ab')
+    self.assertEquals(padding_of(len(sections['heap'])), 4)
+
+  def test_overflow(self):
+    writer = ColumnWriter('foo', AttributeOptions('Foo', 'foo', type = int))
+    writer.append(1 << 63)
+    self.assertRaises(InvalidValueError, dict, writer.sections())
+    writer = ColumnWriter('foo', AttributeOptions('Foo', 'foo', type = long))
+    for _ in (1L << 63, None, -(1L << 70)):
+      writer.append(_)
+    sections = dict(writer.sections())
+    self.assertEquals(sections['status'], '\x01\x02\x01')
+    read = heap_reader(''.join((sections['status'], sections['offsets'],
+      sections['heap'])), {'kind': 'long', 'status': 0, 'offsets': 3,
+        'heap': 3 + 4 * 8}, 0, writer.opts)
+    self.assertEquals([read(_) for _ in range(3)],
+      [1L << 63, None, -(1L << 70)])
@@ -4,6 +4,7 @@
 
 
 import unittest
+import pickle
 
 from structmodel.exceptions import *
 
@@ -182,6 +183,20 @@ class ExceptionsTests(unittest.TestCase):
       self.assertEquals(e.parameters,
         {'attribute': 'Foo.bar'})
 
+  def test_RowProcessingError(self):
+    reason = ValueError('Ouch!')
+    try:
+      raise RowProcessingError(1, reason)
+    except RowProcessingError, e:
+      self.assertEquals(e.parameters, {'row': 1, 'reason': reason})
+
+  def test_SchemaMismatchError(self):
+    try:
+      raise SchemaMismatchError(FooStruct, 'abcd', '0123')
+    except SchemaMismatchError, e:
+      self.assertEquals(e.parameters,
+        {'struct_type': FooStruct, 'expected': 'abcd', 'found': '0123'})
+
   def test_UnrecognizedTypeError(self):
     try:
       raise UnrecognizedTypeError('Foo', 'bar', FooStruct)
@@ -196,6 +211,13 @@ class ExceptionsTests(unittest.TestCase):
       self.assertEquals(e.parameters,
         {'attribute': 'Foo.bar', 'expected_type': str, 'found_type': int})
 
+  def test_IncompatibleSourceError(self):
+    try:
+      raise IncompatibleSourceError(FooStruct, list)
+    except IncompatibleSourceError, e:
+      self.assertEquals(e.parameters,
+        {'struct_type': FooStruct, 'found_type': list})
+
   def test_NonIterableTypeError(self):
     try:
       raise NonIterableTypeError('Foo', 'bar', FooStruct)
@@ -258,3 +280,20 @@ class ExceptionsTests(unittest.TestCase):
     except UnexpectedError, e:
       self.assertFalse(e.parameters)
       self.assertEquals(e.message, 'Ouch!')
+
+  def test_pickle(self):
+    for e in (FrameworkException('Ouch!', foo = 'FOO'),
+      MissingRequiredValueError('Foo', 'bar'),
+      ListBoundaryViolationError('Foo', 'bar', 3, max_length = 2),
+      RowProcessingError(1, 'Ouch!')):
+      clone = pickle.loads(pickle.dumps(e))
+      self.assertEquals(clone.__class__, e.__class__)
+      self.assertEquals(clone.message, e.message)
+      self.assertEquals(clone.parameters, e.parameters)
+
+  def test_violation_of(self):
+    self.assertEquals(violation_of('foo.bar',
+      MissingRequiredValueError('Foo', 'bar')),
+        ('foo.bar', 'MissingRequiredValueError', {'attribute': 'Foo.bar'}))
+    _ = violation_of('foo', ValueError('Ouch!'))
+    self.assertEquals((_.code, _.params), ('ValueError', {'message': 'Ouch!'}))
@@ -4,7 +4,16 @@
 
 
 import unittest
+import binascii
+import copy
+import cPickle
 import datetime
+import gzip
+import os
+import pickle
+import json
+import StringIO
+import tempfile
 
 from structmodel.model import *
 from structmodel.options import *
@@ -203,6 +212,53 @@ class StructOverlayTests(unittest.TestCase):
     overlay.set_options(lenient = True)
     overlay.process_del_value('foo')
 
+  def test_setter_plan(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    self.assertTrue(ValidStruct.__plan__ is overlay.plan)
+    struct = ValidStruct(foo = '1', _bar = 'Bar')
+    self.assertEquals(struct.foo, 1)
+    self.assertEquals(struct._bar, 'Bar')
+    self.assertEquals(sorted(overlay.plan), ['_bar', 'foo'])
+    overlay.set_attribute_options('foo', required = True)
+    self.assertFalse('foo' in overlay.plan)
+    try:
+      struct.foo = None
+      self.assertFalse(True)
+    except MissingRequiredValueError, e:
+      pass
+    overlay.del_attribute('foo')
+    try:
+      struct.foo = 1
+      self.assertFalse(True)
+    except UndefinedAttributeError, e:
+      pass
+
+  def test_overridden_setitem(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    keys = []
+    class RecordingStruct(ValidStruct):
+      def __setitem__(self, key, value):
+        keys.append(key)
+        super(RecordingStruct, self).__setitem__(key, value * 2)
+    struct = RecordingStruct(foo = 1)
+    self.assertEquals(struct.foo, 2)
+    struct.assign(foo = 2)
+    self.assertEquals(struct.foo, 4)
+    self.assertEquals(keys, ['foo', 'foo'])
+    self.assertEquals(Model.loads(RecordingStruct, '{"foo": 3}').foo, 6)
+    self.assertEquals([_.foo for _ in Model.iter_json(RecordingStruct,
+      StringIO.StringIO('[{"foo": 4}]'))], [8])
+    self.assertEquals(keys, ['foo'] * 4)
+    errors = []
+    structs = Model.build_many(RecordingStruct, [{'foo': 5}, {'foo': 'x'}],
+      errors)
+    self.assertEquals(structs[0].foo, 10)
+    self.assertTrue(structs[1] is None)
+    self.assertEquals([_[0] for _ in errors], [1])
+    self.assertEquals(keys, ['foo'] * 6)
+
   def test_invalid_struct_assetion(self):
     overlay = Model.overlay('MyStruct')
     try:
@@ -297,6 +353,91 @@ class StructOverlayTests(unittest.TestCase):
     except StructValidationError, e:
       self.assertEquals(e.parameters, {'name': 'MyStruct', 'explanation': 'Ouch!'})
 
+  def test_compiled_validator(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', required = True)
+    overlay.add_attribute('bar', default = 'Bar')
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct,
+      max_length = 2)
+    overlay.add_attribute('nested', type = ValidStruct)
+    samples = [
+      {},
+      {'foo': 'Foo'},
+      {'foo': 'Foo', 'nested': {}},
+      {'foo': 'Foo', 'nested': {'foo': 'Foo'}},
+      {'foo': 'Foo', 'baz': [{'foo': 'Foo'}, {}]},
+      {'foo': 'Foo', 'baz': [{'foo': 'Foo'}, {'foo': 'Foo'}]}
+    ]
+    def outcome(validate, struct):
+      try:
+        validate(struct)
+        return dict(struct)
+      except FrameworkException, e:
+        return (e.__class__, e.parameters)
+    for sample in samples:
+      self.assertEquals(
+        outcome(overlay.process_validate, ValidStruct(**sample)),
+        outcome(overlay.validate, ValidStruct(**sample)))
+    try:
+      overlay.validate({})
+      self.assertFalse(True)
+    except InvalidStructType, e:
+      pass
+
+  def test_compiled_validator_lifecycle(self):
+    overlay = Model.overlay('MyStruct')
+    struct = ValidStruct()
+    validator = overlay.validator_of()
+    self.assertTrue(validator is overlay.validator_of())
+    struct.validate()
+    overlay.add_validator(lambda o: False, message = 'Ouch!')
+    self.assertFalse(validator is overlay.validator_of())
+    try:
+      struct.validate()
+      self.assertFalse(True)
+    except StructValidationError, e:
+      self.assertEquals(e.parameters, {'name': 'MyStruct', 'explanation': 'Ouch!'})
+
+  def test_implicit_attributes(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.set_options(open = True, json_indent = None)
+    overlay.add_attribute('foo', type = int)
+    struct = ValidStruct(foo = 1).validate()
+    validator = overlay.validator_of()
+    generation = overlay.generation
+    struct.bar = 2
+    struct.baz = 3
+    self.assertEquals(overlay.generation, generation)
+    self.assertTrue(overlay.validator_of() is validator)
+    self.assertEquals(sorted(overlay.implicit), ['bar', 'baz'])
+    self.assertEquals(struct.validate().bar, u'2')
+    self.assertEquals(json.loads(struct.json()),
+      {'foo': 1, 'bar': '2', 'baz': '3'})
+    overlay.set_attribute_options('bar', required = True)
+    self.assertEquals(sorted(overlay.implicit), ['baz'])
+    self.assertFalse(overlay.validator_of() is validator)
+    del struct.__dict__['bar']
+    self.assertRaises(MissingRequireAttributeError, struct.validate)
+
+  def test_attribute_options_generation(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', pattern = '^a')
+    overlay.add_attribute('bar', type = list, item_type = int)
+    struct = ValidStruct(foo = 'abc', bar = ['1'])
+    generation = overlay.generation
+    foo_generation = overlay.attrs['foo'].generation
+    overlay.set_attribute_options('foo', pattern = '^b')
+    overlay.set_attribute_options('bar', item_type = str)
+    self.assertEquals(overlay.generation, generation + 2)
+    self.assertEquals(overlay.attrs['foo'].generation, foo_generation + 1)
+    self.assertRaises(PatternMismatchError, struct.__setitem__, 'foo', 'abc')
+    struct.foo = 'bcd'
+    struct.bar.append(2)
+    self.assertEquals(struct.bar, [1, u'2'])
+    overlay.unset_attribute_options('foo', 'pattern')
+    struct.foo = 'abc'
+    self.assertEquals(overlay.attrs['foo'].generation, foo_generation + 2)
+
   def test_empty_json(self):
     overlay = Model.overlay('MyStruct')
     struct = ValidStruct()
@@ -310,6 +451,724 @@ class StructOverlayTests(unittest.TestCase):
     struct.bar = 'Bar'
     self.assertEquals(overlay.to_json(struct), '{"bar": "Bar"}')
 
+  def test_encoder_lifecycle(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.set_options(json_indent = None)
+    overlay.add_attribute('dateValue', type = datetime.date)
+    struct = ValidStruct(dateValue = datetime.date(2000, 1, 1))
+    encoder = overlay.encoder_of()
+    self.assertTrue(encoder is overlay.encoder_of())
+    self.assertEquals(struct.json(), '{"dateValue": "2000-01-01"}')
+    overlay.set_attribute_options('dateValue', type = str)
+    self.assertFalse(encoder is overlay.encoder_of())
+
+  def test_nested_list_json(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.set_options(json_indent = None)
+    overlay.add_attribute('dates', type = list, item_type = list,
+      item_item_type = datetime.date)
+    overlay.add_attribute('structs', type = list, item_type = list,
+      item_item_type = ValidStruct)
+    struct = ValidStruct(dates = [[datetime.date(2000, 1, 1)]],
+      structs = [[ValidStruct(dates = [])]])
+    self.assertEquals(json.loads(struct.json()), {
+      'dates': [['2000-01-01']], 'structs': [[{'dates': []}]]})
+
+  def test_extra_attribute_json(self):
+    class Extra(object):
+      def __init__(self):
+        self.foo = 'Foo'
+        self._bar = 'Bar'
+    overlay = Model.overlay('MyStruct')
+    overlay.set_options(json_indent = None)
+    overlay.add_attribute('foo')
+    struct = ValidStruct(foo = 'Foo')
+    struct.__dict__['extra'] = {'date': datetime.date(2000, 1, 1),
+      'object': Extra(), 'set': set()}
+    self.assertEquals(json.loads(struct.json()), {'foo': 'Foo',
+      'extra': {'date': '2000-01-01', 'object': {'foo': 'Foo'},
+        'set': 'set([])'}})
+
+  def test_from_json(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = datetime.date)
+    overlay.add_attribute('nested', type = ValidStruct)
+    overlay.add_attribute('items', type = list, item_type = ValidStruct)
+    text = json.dumps({'foo': '1', 'bar': '2000-01-01',
+      'nested': {'foo': 2}, 'items': [{'foo': 3}, None, {'bar': '2000-01-02'}]})
+    struct = ValidStruct.from_json(text)
+    self.assertEquals(struct, ValidStruct(**json.loads(text)))
+    self.assertEquals(struct.nested.foo, 2)
+    self.assertTrue(isinstance(struct.nested, ValidStruct))
+    self.assertTrue(isinstance(struct['items'][0], ValidStruct))
+    self.assertEquals(struct['items'][2].bar, datetime.date(2000, 1, 2))
+    self.assertEquals(Model.loads(ValidStruct, '[{"foo": 1}, {"foo": 2}]'),
+      [ValidStruct(foo = 1), ValidStruct(foo = 2)])
+
+  def test_invalid_from_json(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    try:
+      ValidStruct.from_json('[{"foo": 1}, 2]')
+      self.assertFalse(True)
+    except IncompatibleSourceError, e:
+      self.assertEquals(e.parameters,
+        {'struct_type': ValidStruct, 'found_type': int})
+    try:
+      ValidStruct.from_json('{"bar": 1}')
+      self.assertFalse(True)
+    except UndefinedAttributeError, e:
+      pass
+
+  def test_iter_json(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int, required = True)
+    structs = Model.iter_json(ValidStruct,
+      StringIO.StringIO('[{"foo": "1"}, {"foo": 2}, {}]'), 4)
+    self.assertEquals(structs.next(), ValidStruct(foo = 1))
+    self.assertEquals(structs.next(), ValidStruct(foo = 2))
+    try:
+      structs.next()
+      self.assertFalse(True)
+    except MissingRequireAttributeError, e:
+      pass
+    try:
+      list(Model.iter_json(ValidStruct, StringIO.StringIO('[1]')))
+      self.assertFalse(True)
+    except IncompatibleSourceError, e:
+      self.assertEquals(e.parameters,
+        {'struct_type': ValidStruct, 'found_type': int})
+
+  def test_dump(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = datetime.date)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct)
+    struct = ValidStruct(foo = '2000-01-01', bar = {'foo': '2000-01-02'},
+      baz = [{'foo': '2000-01-03'}, {'bar': {}}])
+    self.assertEquals(''.join(struct.iter_dump(16)), struct.json())
+    self.assertTrue(all(len(_) >= 16 for _ in list(struct.iter_dump(16))[:-1]))
+    overlay.set_options(json_indent = None)
+    fp = StringIO.StringIO()
+    struct.dump(fp)
+    self.assertEquals(fp.getvalue(), struct.json())
+    fp = StringIO.StringIO()
+    Model.dump_many(ValidStruct, (_ for _ in [struct, struct.bar]), fp)
+    self.assertEquals(fp.getvalue(),
+      '[%s, %s]' % (struct.json(), struct.bar.json()))
+    self.assertRaises(InvalidStructType, overlay.iter_dump, {})
+
+  def test_jsonl(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int, required = True)
+    overlay.add_attribute('bar', type = ValidStruct)
+    structs = [ValidStruct(foo = i, bar = {'foo': -i}) for i in range(5)]
+    fp = StringIO.StringIO()
+    Model.write_jsonl(structs, fp, 16)
+    self.assertEquals(fp.getvalue().splitlines()[1], '{"foo":1,"bar":{"foo":-1}}')
+    fp.seek(0)
+    self.assertEquals(list(Model.read_jsonl(ValidStruct, fp, 2)), structs)
+    path = os.path.join(tempfile.mkdtemp(), 'structs.jsonl.gz')
+    try:
+      Model.write_jsonl(structs, path)
+      self.assertEquals(gzip.open(path).read(), fp.getvalue())
+      self.assertEquals(list(Model.read_jsonl(ValidStruct, path)), structs)
+    finally:
+      os.remove(path)
+      os.rmdir(os.path.dirname(path))
+    errors = []
+    fp = StringIO.StringIO('{"foo": 1}\n\n{"foo\n[]\n{}\n{"foo": "2"}\n')
+    self.assertEquals(list(Model.read_jsonl(ValidStruct, fp, 3, errors)),
+      [ValidStruct(foo = 1), ValidStruct(foo = 2)])
+    self.assertEquals([(i, type(e)) for i, e in errors], [(2, ValueError),
+      (3, IncompatibleSourceError), (4, MissingRequireAttributeError)])
+    try:
+      list(Model.read_jsonl(ValidStruct, StringIO.StringIO('{}')))
+      self.assertFalse(True)
+    except RowProcessingError, e:
+      self.assertEquals(e.parameters['row'], 0)
+    errors = []
+    fp = StringIO.StringIO()
+    Model.write_jsonl([structs[0], 'foo'], fp, errors = errors)
+    self.assertEquals(fp.getvalue(), '{"foo":0,"bar":{"foo":0}}\n')
+    self.assertEquals(errors[0][0], 1)
+
+  def test_binary(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.set_options(open = True)
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct)
+    overlay.add_attribute('date', type = datetime.datetime)
+    overlay.add_attribute('flag', type = bool)
+    overlay.add_attribute('text')
+    overlay.add_attribute('values', type = list, item_type = float)
+    overlay.add_attribute('big', type = long)
+    struct = ValidStruct(foo = -1, big = 1 << 80, bar = {'text': u'\xe9t\xe9'},
+      baz = [{'foo': 1}, None, {'values': [0.5, 1.5]}], flag = False,
+      date = '2000-01-02T03:04:05.000006+01:30', text = None)
+    struct.extra = 'Extra'
+    data = struct.to_bytes()
+    for buf in (data, bytearray(data), memoryview(data)):
+      clone = Model.from_bytes(ValidStruct, buf)
+      self.assertEquals(clone, struct)
+    self.assertEquals(clone.date.utcoffset(), datetime.timedelta(hours = 1.5))
+    self.assertTrue(isinstance(clone.baz[2].values, CustomList))
+    self.assertTrue(len(data) < len(overlay.to_json(struct)))
+    self.assertRaises(UnexpectedError,
+      Model.from_bytes, ValidStruct, data + '\x00')
+    for i in xrange(len(data)):
+      self.assertRaises(UnexpectedError if i >= 8 else SchemaMismatchError,
+        Model.from_bytes, ValidStruct, data[:i])
+    overlay.add_attribute('qux', type = float)
+    try:
+      Model.from_bytes(ValidStruct, data)
+      self.assertFalse(True)
+    except SchemaMismatchError, e:
+      self.assertEquals(e.parameters['expected'],
+        binascii.hexlify(overlay.fingerprint()))
+
+  def test_binary_overflow(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = long)
+    struct = ValidStruct(foo = 1, bar = 1 << 64)
+    self.assertEquals(Model.from_bytes(ValidStruct, struct.to_bytes()), struct)
+    struct.foo = 1 << 63
+    self.assertRaises(InvalidValueError, struct.to_bytes)
+
+  def test_check(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int, required = True)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct)
+    overlay.add_attribute('qux', default = 'Qux')
+    overlay.add_validator(lambda o: o.get('foo', 0) >= 0, message = 'Ouch!')
+    struct = ValidStruct(bar = {'foo': -1}, baz = [{'foo': 1}, {'qux': 'Qux'}])
+    overlay.set_attribute_options('baz', min_length = 3)
+    self.assertEquals(sorted(struct.violations()), [
+      ('bar', 'StructValidationError',
+        {'name': 'MyStruct', 'explanation': 'Ouch!'}),
+      ('bar.baz', 'MissingRequiredValueError', {'attribute': 'MyStruct.baz'}),
+      ('baz', 'ListBoundaryViolationError', {'attribute': 'MyStruct.baz',
+        'estimated_length': 2, 'min_length': 3, 'max_length': None}),
+      ('baz[0].baz', 'MissingRequiredValueError',
+        {'attribute': 'MyStruct.baz'}),
+      ('baz[1].baz', 'MissingRequiredValueError',
+        {'attribute': 'MyStruct.baz'}),
+      ('baz[1].foo', 'MissingRequireAttributeError',
+        {'attribute': 'MyStruct.foo'}),
+      ('foo', 'MissingRequireAttributeError', {'attribute': 'MyStruct.foo'})
+    ])
+    self.assertRaises(ValidationException, struct.validate)
+    self.assertEquals(struct.qux, 'Qux')
+    overlay.unset_attribute_options('baz', 'min_length')
+    self.assertEquals(ValidStruct(foo = 1).violations(), [])
+    rows = [{'foo': 1}, ValidStruct(foo = 2), {'foo': 'x', 'zap': 1}]
+    results = list(Model.check_many(ValidStruct, rows))
+    self.assertEquals([_[1] for _ in results[:2]], [[], []])
+    self.assertTrue(results[1][0] is rows[1])
+    errors = sorted(results[2][1])
+    self.assertEquals([(_.path, _.code) for _ in errors], [
+      ('foo', 'ValueError'),
+      ('zap', 'UndefinedAttributeError')])
+    self.assertEquals(errors[1].params,
+      {'attribute': 'MyStruct.zap'})
+
+  def test_check_lazy_list(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct,
+      lazy = True)
+    struct = ValidStruct(baz = [{'foo': 1}, 5])
+    self.assertEquals([(_.path, _.code) for _ in struct.violations()], [
+      ('baz', 'IncompatibleTypeError')])
+    results = list(Model.check_many(ValidStruct, [{'baz': [5]}]))
+    self.assertEquals([(_.path, _.code) for _ in results[0][1]], [
+      ('baz', 'IncompatibleTypeError')])
+
+  def test_freeze(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.set_options(open = True)
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = list, item_type = list,
+      item_item_type = int)
+    report = Model.freeze()
+    try:
+      self.assertTrue(report['seconds'] >= report['overlays']['MyStruct'])
+      self.assertEquals(set(overlay.plan), set(['foo', 'bar']))
+      for _ in ('validator', 'checker', 'encoder', 'dumper', 'packer'):
+        self.assertTrue(_ in overlay.compiled)
+      item_opts = ListType.item_options(overlay.attrs['bar'])
+      self.assertTrue(ListType.item_options(item_opts).cache.setter)
+      self.assertRaises(UnexpectedError, overlay.add_attribute, 'baz')
+      self.assertRaises(UnexpectedError, Model.define('baz'), ValidStruct)
+      self.assertRaises(UnexpectedError, Model.declare('Other'),
+        type('Other', (Struct,), {}))
+      self.assertRaises(UnexpectedError, Model.instrument)
+      generation = overlay.generation
+      struct = ValidStruct(foo = '1', bar = [['2']], baz = 3, _qux = 4)
+      self.assertEquals(struct, {'foo': 1, 'bar': [[2]], 'baz': '3',
+        '_qux': 4})
+      self.assertEquals(set(overlay.attrs), set(['foo', 'bar']))
+      self.assertEquals(set(overlay.plan), set(['foo', 'bar']))
+      self.assertEquals(overlay.generation, generation)
+      struct.validate()
+    finally:
+      Model.thaw()
+    overlay.add_attribute('baz')
+
+  def test_load(self):
+    spec = {
+      'LoadedChild': {'attributes': {'foo': {'type': 'int'}}},
+      'LoadedParent': {
+        'options': {'open': True},
+        'attributes': {
+          'child': {'type': 'LoadedChild', 'required': True},
+          'items': {'type': 'list', 'item_type': 'LoadedChild'},
+          'day': {'type': 'date'}
+        }
+      }
+    }
+    class LoadedChild(Struct):
+      pass
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+      loaded = Model.load(spec, {'LoadedChild': LoadedChild}, warm_up = True)
+      self.assertEquals(set(loaded), set(['LoadedChild', 'LoadedParent']))
+      self.assertTrue(loaded['LoadedChild'] is LoadedChild)
+      self.assertTrue('validator' in \
+        Model.overlay_of(loaded['LoadedParent']).compiled)
+      parent = loaded['LoadedParent'](child = {'foo': '1'},
+        items = [{'foo': 2}], day = '2000-01-02', extra = 3).validate()
+      self.assertTrue(isinstance(parent.child, LoadedChild))
+      self.assertEquals(parent.child.foo, 1)
+      self.assertTrue(isinstance(parent['items'][0], LoadedChild))
+      self.assertEquals(parent.day, datetime.date(2000, 1, 2))
+      self.assertEquals(parent.extra, '3')
+      self.assertRaises(FrameworkException,
+        loaded['LoadedParent']().validate, True)
+      for name in loaded:
+        del Model.registry[name]
+      with open(path, 'w') as fp:
+        json.dump(spec, fp)
+      loaded = Model.load(path)
+      self.assertFalse(loaded['LoadedChild'] is LoadedChild)
+      self.assertEquals(loaded['LoadedParent'](child = {'foo': '1'}).child,
+        {'foo': 1})
+      for name in loaded:
+        del Model.registry[name]
+      loaded = Model.load({
+        'LoadedChild': {'attributes': {'foo': {'type': int}}}})
+      self.assertEquals(loaded['LoadedChild'](foo = '4'), {'foo': 4})
+      self.assertRaises(UnexpectedError, Model.load,
+        {'LoadedOther': {'attributes': {'foo': {'type': 'Unknown'}}}})
+    finally:
+      for _ in ('LoadedChild', 'LoadedParent', 'LoadedOther'):
+        Model.registry.pop(_, None)
+      os.remove(path)
+
+  def test_stats(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = list, item_type = int)
+    def positive(struct):
+      return struct.get('foo', 0) >= 0
+    overlay.add_validator(positive)
+    setter = overlay.setter_of('foo')
+    self.assertTrue(setter is DataType.setter_of(overlay.attrs['foo']))
+    Model.instrument()
+    try:
+      self.assertFalse(overlay.setter_of('foo') is setter)
+      struct = ValidStruct(foo = '1', bar = [1, '2'])
+      struct.foo = 2
+      self.assertRaises(ValueError, struct.__setitem__, 'foo', 'x')
+      struct.validate()
+      struct.json()
+      stats = Model.stats()['MyStruct']
+      self.assertEquals(stats['set']['foo']['calls'], 3)
+      self.assertEquals(stats['set']['foo']['errors'], 1)
+      filters = stats['filter']
+      self.assertEquals(filters['foo']['IntegerType.value_of']['calls'], 3)
+      self.assertEquals(filters['bar[*]']['IntegerType.value_of']['calls'], 2)
+      self.assertEquals(stats['validate']['calls'], 1)
+      self.assertEquals(stats['validator']['positive']['calls'], 1)
+      self.assertEquals(stats['to_json']['calls'], 1)
+      self.assertEquals(json.loads(json.dumps(Model.stats()))['MyStruct'],
+        stats)
+      Model.reset_stats()
+      self.assertEquals(Model.stats(), {})
+    finally:
+      Model.instrument(False)
+    self.assertTrue(overlay.setter_of('foo') is \
+      DataType.setter_of(overlay.attrs['foo']))
+    ValidStruct(foo = 1).json()
+    self.assertEquals(Model.stats(), {})
+
+  def test_columns(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.set_options(open = True)
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('date', type = datetime.datetime)
+    overlay.add_attribute('day', type = datetime.date)
+    overlay.add_attribute('text')
+    overlay.add_attribute('values', type = list, item_type = float)
+    structs = [
+      ValidStruct(foo = 1, text = u'\xe9t\xe9', values = [0.5],
+        date = '2000-01-02T03:04:05.000006+01:30', day = '2000-01-02'),
+      ValidStruct(text = None, bar = {'foo': 2}),
+      ValidStruct(text = '', extra = 'Extra')
+    ]
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+      self.assertEquals(Model.write_columns(ValidStruct, structs, path), 3)
+      with Model.open_columns(ValidStruct, path) as store:
+        self.assertEquals(len(store), 3)
+        row = store[0]
+        self.assertTrue(isinstance(row, AbstractStruct))
+        self.assertEquals(row.text, u'\xe9t\xe9')
+        self.assertEquals(row.date.utcoffset(),
+          datetime.timedelta(hours = 1.5))
+        self.assertEquals(row, structs[0])
+        self.assertEquals(store[-2].bar, ValidStruct(foo = 2))
+        self.assertEquals(store[1], structs[1])
+        self.assertFalse('foo' in store[2])
+        self.assertFalse('extra' in store[2])
+        self.assertEquals(store.column('foo'), [1, None, None])
+        self.assertRaises(UnexpectedError, store[0].__setitem__, 'foo', 2)
+        self.assertRaises(IndexError, store.__getitem__, 3)
+        struct = store[0].materialize()
+        self.assertTrue(isinstance(struct, ValidStruct))
+        self.assertEquals(struct, structs[0])
+        struct.foo = 2
+        self.assertEquals(store[0].foo, 1)
+        self.assertEquals([_.json() for _ in store][1:],
+          [structs[1].json(), ValidStruct(text = '').json()])
+      overlay.add_attribute('qux', type = float)
+      self.assertRaises(SchemaMismatchError,
+        Model.open_columns, ValidStruct, path)
+    finally:
+      os.remove(path)
+
+  def test_build_many(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = list, item_type = ValidStruct)
+    rows = [{'foo': '1'}, {'foo': 2, '_baz': 'Baz'}, {}, {'foo': 3},
+      {'bar': [{'foo': '4'}]}]
+    structs = Model.build_many(ValidStruct, iter(rows))
+    self.assertEquals(structs, [ValidStruct(**_) for _ in rows])
+    self.assertTrue(all(isinstance(_, ValidStruct) for _ in structs))
+    self.assertEquals(structs[4].bar[0].foo, 4)
+
+  def test_build_many_errors(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    rows = [{'foo': 1}, {'foo': 'x'}, {'foo': 3}, {'bar': 4}]
+    errors = []
+    structs = Model.build_many(ValidStruct, rows, errors)
+    self.assertEquals(structs,
+      [ValidStruct(foo = 1), None, ValidStruct(foo = 3), None])
+    self.assertEquals([_[0] for _ in errors], [1, 3])
+    self.assertTrue(isinstance(errors[0][1], ValueError))
+    self.assertTrue(isinstance(errors[1][1], UndefinedAttributeError))
+    try:
+      Model.build_many(ValidStruct, rows)
+      self.assertFalse(True)
+    except RowProcessingError, e:
+      self.assertEquals(e.parameters['row'], 1)
+
+  def test_pickle(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = list, item_type = list,
+      item_item_type = int)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct)
+    overlay.add_attribute('nested', type = ValidStruct)
+    struct = ValidStruct(foo = 1, bar = [[1, 2], [3]], baz = [{'foo': 2}],
+      nested = {'foo': 3})
+    for protocol in (0, pickle.HIGHEST_PROTOCOL):
+      for dumps, loads in ((pickle.dumps, pickle.loads),
+        (cPickle.dumps, cPickle.loads)):
+        clone = loads(dumps(struct, protocol))
+        self.assertEquals(clone, struct)
+        self.assertTrue(isinstance(clone.nested, ValidStruct))
+        self.assertTrue(isinstance(clone.bar, CustomList))
+        self.assertTrue(clone.bar.opts is struct.bar.opts)
+        self.assertTrue(clone.bar[0].opts is struct.bar[0].opts)
+        self.assertTrue(isinstance(clone.baz[0], ValidStruct))
+        self.assertTrue(clone.baz.opts is struct.baz.opts)
+    clone = copy.deepcopy(struct)
+    self.assertEquals(clone, struct)
+    self.assertFalse(clone.nested is struct.nested)
+
+  def test_validate_many(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int, required = True)
+    rows = [{'foo': i} for i in range(10)] + [{}, {'foo': 'x'}]
+    for workers in (None, 2):
+      errors = []
+      structs = list(Model.validate_many(ValidStruct, rows,
+        workers = workers, chunk_size = 3, errors = errors))
+      self.assertEquals(structs,
+        [ValidStruct(foo = i) for i in range(10)] + [None, None])
+      self.assertEquals([_[0] for _ in errors], [10, 11])
+      self.assertTrue(isinstance(errors[0][1], MissingRequireAttributeError))
+      self.assertEquals(errors[0][1].parameters,
+        {'attribute': 'MyStruct.foo'})
+      self.assertTrue(isinstance(errors[1][1], ValueError))
+    try:
+      list(Model.validate_many(ValidStruct, rows, workers = 2))
+      self.assertFalse(True)
+    except RowProcessingError, e:
+      self.assertEquals(e.parameters['row'], 10)
+
+  def test_compact(self):
+    try:
+      Model.declare('MyCompact', open = True, compact = True)(ValidStruct)
+      self.assertFalse(True)
+    except UnexpectedError, e:
+      pass
+    try:
+      compact_cls = Model.declare('MyCompact', compact = True)(ValidStruct)
+      Model.define('foo', type = int, required = True)(compact_cls)
+      Model.define('bar', type = list, item_type = int)(compact_cls)
+      Model.define('nested', type = compact_cls)(compact_cls)
+      self.assertTrue(issubclass(compact_cls, ValidStruct))
+      self.assertEquals(ValidStruct.__internal_name__, 'MyStruct')
+      struct = compact_cls(foo = '1', bar = ['2'], nested = {'foo': 3})
+      struct._hidden = 'x'
+      self.assertEquals(compact_cls.__slots__, ('__values__',))
+      self.assertEquals(struct, {'foo': 1, 'bar': [2], 'nested': {'foo': 3},
+        '_hidden': 'x'})
+      self.assertEquals(len(struct), 4)
+      self.assertEquals(sorted(struct), ['_hidden', 'bar', 'foo', 'nested'])
+      self.assertEquals(struct.foo, 1)
+      self.assertEquals(struct['nested'].foo, 3)
+      self.assertTrue('bar' in struct)
+      self.assertEquals(struct.get('baz', 'none'), 'none')
+      self.assertEquals(json.loads(struct.json()),
+        {'foo': 1, 'bar': [2], 'nested': {'foo': 3}})
+      self.assertTrue(struct.validate() is struct)
+      del struct.bar
+      self.assertFalse('bar' in struct)
+      self.assertRaises(KeyError, struct.__getitem__, 'bar')
+      self.assertRaises(MissingRequireAttributeError, struct.__delitem__, 'foo')
+      self.assertRaises(UndefinedAttributeError, struct.__setitem__, 'baz', 1)
+      clone = copy.deepcopy(struct)
+      self.assertTrue(clone.__class__ is compact_cls)
+      self.assertEquals(clone, struct)
+      self.assertEquals(Model.loads(compact_cls, '{"foo": "2"}'), {'foo': 2})
+      self.assertEquals(Model.build_many(compact_cls,
+        [{'foo': 1}, {'foo': 2, 'bar': [3]}]),
+          [{'foo': 1}, {'foo': 2, 'bar': [3]}])
+      Model.define('baz')(compact_cls)
+      struct.baz = 'late'
+      self.assertEquals(struct.baz, u'late')
+      class Plain(Struct):
+        pass
+      Model.declare('MyCompact', compact = True)(Plain)
+      self.assertRaises(UnexpectedError, Model.overlay_of, Plain)
+      self.assertRaises(UnexpectedError, Plain, foo = 1)
+    finally:
+      del Model.registry['MyCompact']
+
+  def test_lazy_attribute(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('nested', type = ValidStruct, lazy = True)
+    self.assertTrue(isinstance(ValidStruct.__dict__['nested'], LazyAttribute))
+    struct = ValidStruct.from_json('{"nested": {"foo": "1"}}')
+    self.assertEquals(struct.__dict__['nested'], {u'foo': u'1'})
+    self.assertEquals(json.loads(struct.json()), {'nested': {'foo': '1'}})
+    self.assertEquals(struct.get('missing', {}), {})
+    self.assertEquals(struct.nested.foo, 1)
+    self.assertTrue(isinstance(struct.__dict__['nested'], ValidStruct))
+    self.assertEquals(json.loads(struct.json()), {'nested': {'foo': 1}})
+    struct = Model.build_many(ValidStruct, [{'nested': {'foo': 'x'}}])[0]
+    self.assertRaises(ValueError, struct.validate)
+    struct.nested = {'foo': '2'}
+    self.assertEquals(struct.validate()['nested'], {'foo': 2})
+    struct.nested = ValidStruct(foo = 3)
+    self.assertEquals(struct.nested.foo, 3)
+    overlay.set_attribute_options('nested', lazy = False)
+    self.assertFalse('nested' in ValidStruct.__dict__)
+    struct = ValidStruct(nested = {'foo': '4'})
+    self.assertTrue(isinstance(struct.__dict__['nested'], ValidStruct))
+
+  def test_lazy_attribute_items(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('nested', type = ValidStruct, lazy = True)
+    struct = ValidStruct.from_json('{"nested": {"foo": "1"}}')
+    items = dict(struct.iteritems())
+    self.assertTrue(isinstance(items['nested'], ValidStruct))
+    self.assertEquals(items['nested'].foo, 1)
+    try:
+      compact_cls = Model.declare('MyCompact', compact = True)(ValidStruct)
+      Model.define('nested', type = compact_cls, lazy = True)(compact_cls)
+      struct = compact_cls.from_json('{"nested": {}}')
+      items = dict(struct.iteritems())
+      self.assertTrue(isinstance(items['nested'], compact_cls))
+    finally:
+      del Model.registry['MyCompact']
+
+  def test_deferred_list_attribute(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = list, item_type = int, lazy = True)
+    overlay.add_attribute('bar', type = list, item_type = ValidStruct,
+      lazy = True)
+    struct = ValidStruct.from_json('{"foo": ["1", "x"], "bar": [{"foo": []}]}')
+    self.assertTrue(isinstance(struct.foo, DeferredList))
+    self.assertTrue(isinstance(struct.bar, DeferredList))
+    struct.validate()
+    self.assertTrue(isinstance(struct.foo, DeferredList))
+    self.assertRaises(ValueError, struct.validate, True)
+    struct.foo[1] = 2
+    self.assertTrue(struct.validate(strict = True) is struct)
+    self.assertTrue(isinstance(struct.bar[0], ValidStruct))
+    self.assertEquals(json.loads(struct.json()),
+      {'foo': [1, 2], 'bar': [{'foo': []}]})
+
+  def test_dirty_tracking(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct)
+    calls = []
+    overlay.add_validator(lambda s: calls.append(s) or s.get('foo', 0) < 10)
+    struct = ValidStruct(foo = 1, bar = {'foo': 2}, baz = [{'foo': 3}])
+    struct.validate()
+    self.assertEquals(len(calls), 3)
+    struct.validate()
+    self.assertEquals(len(calls), 3)
+    struct.bar.foo = 20
+    self.assertRaises(StructValidationError, struct.validate)
+    struct.bar.foo = 4
+    del calls[:]
+    struct.validate()
+    self.assertEquals(calls, [struct.bar, struct])
+    struct.baz[0].foo = 30
+    self.assertRaises(StructValidationError, struct.validate)
+    del struct.baz[0]
+    del calls[:]
+    struct.validate()
+    self.assertEquals(calls, [struct])
+    struct.baz.append({'foo': 40})
+    self.assertRaises(StructValidationError, struct.validate)
+    struct.baz[0] = {'foo': 5}
+    struct.validate()
+    overlay.add_attribute('foobar', required = True)
+    self.assertRaises(MissingRequireAttributeError, struct.validate)
+
+  def test_validation_stamp(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    calls = []
+    overlay.add_validator(lambda s: calls.append(s) or True)
+    child_cls = Model.declare('MyChild')(type('Child', (Struct,), {}))
+    other_cls = Model.declare('MyOther', open = True)(
+      type('Other', (Struct,), {}))
+    try:
+      Model.define('bar', type = child_cls)(ValidStruct)
+      struct = ValidStruct(foo = 1, bar = {})
+      struct.validate()
+      self.assertEquals(len(calls), 1)
+      Model.define('baz')(other_cls)
+      other_cls(qux = 1).validate()
+      struct.validate()
+      self.assertEquals(len(calls), 1)
+      Model.define('baz', required = True)(child_cls)
+      self.assertRaises(MissingRequireAttributeError, struct.validate)
+      struct.bar.baz = 'x'
+      struct.validate()
+      self.assertEquals(len(calls), 2)
+    finally:
+      del Model.registry['MyChild']
+      del Model.registry['MyOther']
+
+  def test_copy(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct)
+    struct = ValidStruct(foo = 1, bar = {'foo': 2}, baz = [{'foo': 3}])
+    clone = struct.copy()
+    self.assertEquals(clone, struct)
+    self.assertTrue(clone.bar is struct.bar)
+    clone = copy.deepcopy(struct)
+    self.assertEquals(clone, struct)
+    self.assertFalse(clone.bar is struct.bar)
+    self.assertFalse(clone.baz[0] is struct.baz[0])
+    self.assertTrue(isinstance(clone.baz, CustomList))
+    clone = struct.copy(cow = True)
+    self.assertTrue(clone.__dict__['bar'] is struct.__dict__['bar'])
+    clone.bar.foo = 4
+    clone.baz[0].foo = 5
+    struct.baz.append({'foo': 6})
+    self.assertEquals(struct.bar.foo, 2)
+    self.assertEquals(struct.baz, [{'foo': 3}, {'foo': 6}])
+    self.assertEquals(clone.baz, [{'foo': 5}])
+    replacement = ValidStruct(foo = 7)
+    clone = struct.copy(cow = True)
+    clone.bar = replacement
+    self.assertTrue(clone.bar is replacement)
+
+  def test_copy_on_write_iteration(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('baz', type = list, item_type = int)
+    struct = ValidStruct(bar = {'foo': 1}, baz = [2])
+    clone = struct.copy(cow = True)
+    dict(clone.iteritems())['baz'].append(3)
+    self.assertEquals(struct.baz, [2])
+    self.assertEquals(clone.baz, [2, 3])
+    clone = struct.copy(cow = True)
+    for value in clone.itervalues():
+      if isinstance(value, ValidStruct):
+        value.foo = 4
+    dict(clone.items())['baz'].append(5)
+    self.assertEquals(struct, {'bar': {'foo': 1}, 'baz': [2]})
+    self.assertEquals(clone, {'bar': {'foo': 4}, 'baz': [2, 5]})
+    clone = struct.copy(cow = True)
+    self.assertEquals(json.loads(clone.json()), {'bar': {'foo': 1}, 'baz': [2]})
+    self.assertTrue(clone.__dict__['baz'] is struct.__dict__['baz'])
+
+  def test_copy_on_write_ownership(self):
+    overlay = Model.overlay('MyStruct')
+    overlay.add_attribute('foo', type = int)
+    overlay.add_attribute('bar', type = ValidStruct)
+    overlay.add_attribute('baz', type = list, item_type = ValidStruct)
+    struct = ValidStruct(bar = {'foo': 1, 'bar': {'foo': 2}},
+      baz = [{'foo': 3}])
+    bar, baz = struct.bar, struct.baz
+    clone = struct.copy(cow = True)
+    self.assertTrue(struct.bar is bar and struct.baz is baz)
+    self.assertTrue(struct.bar.bar is bar.bar)
+    self.assertTrue(struct.baz[0] is baz[0])
+    self.assertTrue(clone.__dict__['bar'] is bar)
+    self.assertTrue(clone.__dict__['baz'] is baz)
+    bar.bar.foo = 4
+    baz[0].foo = 5
+    baz.append({'foo': 6})
+    self.assertTrue(struct.bar is bar and struct.baz is baz)
+    self.assertEquals(struct, {'bar': {'foo': 1, 'bar': {'foo': 4}},
+      'baz': [{'foo': 5}, {'foo': 6}]})
+    self.assertEquals(clone, {'bar': {'foo': 1, 'bar': {'foo': 2}},
+      'baz': [{'foo': 3}]})
+    struct.validate()
+    clone = struct.copy(cow = True)
+    struct.bar.foo = 7
+    self.assertEquals(clone.bar.foo, 1)
+    clone.bar.bar.foo = 8
+    self.assertEquals(struct.bar.bar.foo, 4)
+    self.assertEquals(struct.validate().bar.foo, 7)
+
   def test_comprehensive_model_with_json(self):
     overlay = Model.overlay('MyStruct')
     overlay.set_options(open = True, json_indent = 1, json_item_sep = ',', json_dict_sep = ':')
@@ -48,6 +48,7 @@ class StructOptionsTests(GenericOptionsTests):
     self.defaults = {
       'open': False,
       'lenient': False,
+      'compact': False,
       'json_indent': 2,
       'json_item_sep': ', ',
       'json_dict_sep': ': '
@@ -75,15 +76,25 @@ class AttributeOptionsTests(GenericOptionsTests):
       'normalize': False,
       'min_length': None,
       'max_length': None,
-      'format': None
+      'format': None,
+      'lazy': False
     }
 
   def test_internals(self):
     self.assertEquals(self.options.namespace, 'Foo')
     self.assertEquals(self.options.name, 'bar')
     self.assertEquals(self.options.cache, {})
+    self.assertEquals(self.options.generation, 0)
+
+  def test_fresh_cache(self):
+    cache = self.options.fresh_cache()
+    cache.filters = ['X']
+    self.assertEquals(self.options.fresh_cache().filters, ['X'])
+    self.options.touch()
+    self.assertEquals(self.options.generation, 1)
+    self.assertEquals(self.options.fresh_cache(), {'generation': 1})
 
   def test_filter_internals(self):
     self.assertEquals(
       AttributeOptions.filter_internals(
-        {'namespace': '', 'name': '', 'cache': {}}), {})
+        {'namespace': '', 'name': '', 'cache': {}, 'generation': 0}), {})
@@ -0,0 +1,60 @@
+#
+# Copyright
+#
+
+
+import unittest
+import datetime
+
+from structmodel.compiler import Source
+from structmodel.exceptions import *
+from structmodel.schema import *
+
+
+class SchemaTests(unittest.TestCase):
+
+  def test_declarations(self):
+    spec = {
+      u'Foo': {u'attributes': {u'bar': {u'type': u'int'}, u'baz': {}}},
+      u'Bar': {u'options': {u'open': True}}
+    }
+    self.assertEquals(declarations_of(spec), [
+      ('Bar', {'open': True}, []),
+      ('Foo', {}, [('bar', {'type': u'int'}), ('baz', {})])])
+    self.assertRaises(UnexpectedError, declarations_of,
+      {'Foo': {'fields': {}}})
+    self.assertRaises(UnexpectedError, declarations_of, {'Foo': []})
+
+  def test_resolve_types(self):
+    class Foo(object):
+      pass
+    opts = {'type': 'list', 'item_type': 'Foo', 'item_item_type': 'date',
+      'default': 'int'}
+    self.assertEquals(resolve_types(opts, {'Foo': Foo}), {'type': list,
+      'item_type': Foo, 'item_item_type': datetime.date, 'default': 'int'})
+    self.assertEquals(opts['type'], 'list')
+    self.assertRaises(UnexpectedError, resolve_types, {'type': 'Foo'}, {})
+
+  def test_compile(self):
+    first = Source('foo', 'bar')
+    first.emit('return bar', 1)
+    second = Source('foo', 'bar')
+    second.emit('return bar', 1)
+    self.assertTrue(first.compile(('Foo', 'first')).func_code is \
+      second.compile(('Foo', 'second')).func_code)
+    self.assertEquals(Source.codes[first.text()][1], 2)
+    third = Source('foo', 'bar')
+    third.emit('return None', 1)
+    third.compile(('Foo', 'second'))
+    third.compile(('Foo', 'first'))
+    self.assertFalse(first.text() in Source.codes)
+    self.assertEquals(Source.codes[third.text()][1], 2)
+    for key in (('Foo', 'first'), ('Foo', 'second')):
+      Source.release(key)
+    self.assertFalse(third.text() in Source.codes)
+    self.assertFalse(Source('foo').compile().func_code is \
+      Source('foo').compile().func_code)
+
+
+if __name__ == '__main__':
+  unittest.main()
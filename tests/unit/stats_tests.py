@@ -0,0 +1,31 @@
+#
+# Copyright
+#
+
+
+import unittest
+
+from structmodel import stats
+from structmodel.types import IntegerType
+
+
+class StatsTests(unittest.TestCase):
+
+  def tearDown(self):
+    stats.entries.clear()
+
+  def test_timed(self):
+    func = stats.timed(lambda x: 1 / x, 'Foo', 'set', 'bar')
+    self.assertEquals(func(1), 1)
+    self.assertRaises(ZeroDivisionError, func, 0)
+    _ = stats.snapshot()['Foo']['set']['bar']
+    self.assertEquals((_['calls'], _['errors']), (2, 1))
+    stats.reset()
+    self.assertEquals(stats.snapshot(), {})
+
+  def test_name_of(self):
+    def foo():
+      pass
+    self.assertEquals(stats.name_of(foo), 'foo')
+    self.assertEquals(stats.name_of(IntegerType.value_of),
+      'IntegerType.value_of')
@@ -0,0 +1,76 @@
+#
+# Copyright
+#
+
+
+import unittest
+import json
+import StringIO
+
+from structmodel.exceptions import *
+from structmodel.streams import *
+
+
+def read_all(text, chunk_size = 1):
+  return list(ArrayReader(StringIO.StringIO(text), chunk_size))
+
+
+class ArrayReaderTests(unittest.TestCase):
+
+  def test_empty_array(self):
+    self.assertEquals(read_all('[]'), [])
+    self.assertEquals(read_all(' [ \n ] '), [])
+
+  def test_small_chunks(self):
+    text = '[{"foo": "Foo", "bar": [1, 2]}, 12345, "x\\u00e9", null, {}]'
+    for chunk_size in (1, 2, 3, 7, 1024):
+      self.assertEquals(read_all(text, chunk_size),
+        [{'foo': 'Foo', 'bar': [1, 2]}, 12345, u'x\xe9', None, {}])
+
+  def test_multibyte_boundary(self):
+    self.assertEquals(read_all('["\xc3\xa9\xc3\xa9"]'), [u'\xe9\xe9'])
+
+  def test_bounded_buffer(self):
+    text = '[' + ', '.join(['{"foo": %d}' % i for i in range(1000)]) + ']'
+    reader = ArrayReader(StringIO.StringIO(text), 64)
+    for item in reader:
+      self.assertTrue(len(reader.buffer) < 256)
+
+  def test_not_an_array(self):
+    try:
+      read_all('{"foo": 1}')
+      self.assertFalse(True)
+    except IncompatibleSourceError, e:
+      self.assertEquals(e.parameters,
+        {'struct_type': None, 'found_type': dict})
+
+  def test_malformed_array(self):
+    for text in ('[1 2]', '[1,', '[{"foo": }]'):
+      try:
+        read_all(text)
+        self.assertFalse(True)
+      except ValueError, e:
+        pass
+
+  def test_malformed_item_bound(self):
+    text = '[{"foo": }, ' + ', '.join(['{"foo": 1}'] * 1000) + ']'
+    source = StringIO.StringIO(text)
+    reader = ArrayReader(source, 64, max_size = 256)
+    self.assertRaises(ValueError, list, reader)
+    self.assertTrue(source.tell() < 1024)
+    self.assertEquals(list(ArrayReader(StringIO.StringIO(
+      '["%s"]' % ('x' * 1000)), 64, max_size = 2048)), ['x' * 1000])
+
+
+class ArrayWriterTests(unittest.TestCase):
+
+  def test_array_writer(self):
+    self.assertEquals(json.dumps(ArrayWriter(iter([]))), '[]')
+    self.assertEquals(json.dumps(ArrayWriter(x * 2 for x in range(3))),
+      '[0, 2, 4]')
+
+  def test_buffered(self):
+    chunks = list(buffered(iter(['ab'] * 3000), 1000))
+    self.assertEquals(''.join(chunks), 'ab' * 3000)
+    self.assertTrue(all(len(_) >= 1000 for _ in chunks[:-1]))
+    self.assertEquals(list(buffered([])), [])
@@ -5,6 +5,7 @@
 
 import unittest
 import datetime
+import pickle
 
 from structmodel.model import *
 from structmodel.options import *
@@ -74,6 +75,13 @@ class AnotherValidStruct(Struct):
   pass
 
 
+def outcome(func, value):
+  try:
+    return func(value)
+  except FrameworkException, e:
+    return (e.__class__, e.parameters)
+
+
 class TypeRegistryTests(unittest.TestCase):
 
   def test_initial_registry(self):
@@ -146,6 +154,57 @@ class ValueProcessorTests(unittest.TestCase):
           filter_1 = True, filter_2 = True, filter_3 = True),
             'X'), 'X/1//2//3/')
 
+  def test_setter_cache(self):
+    opts = AttributeOptions('Foo', 'bar', type = int)
+    setter = DataType.setter_of(opts)
+    self.assertTrue(setter is opts.cache.setter)
+    self.assertTrue(setter is DataType.setter_of(opts))
+
+  def test_column(self):
+    opts = AttributeOptions('Foo', 'bar', type = int, required = True)
+    column = DataType.column_of(opts)
+    self.assertTrue(column is opts.cache.column)
+    self.assertEquals(column(['1', 2, 3.5]), [1, 2, 3])
+    try:
+      column([1, None])
+      self.assertFalse(True)
+    except MissingRequiredValueError, e:
+      pass
+
+  def test_setter_missing_required(self):
+    try:
+      DataType.setter_of(
+        AttributeOptions('Foo', 'bar', required = True))(None)
+      self.assertFalse(True)
+    except MissingRequiredValueError, e:
+      self.assertEquals(e.parameters, {'attribute': 'Foo.bar'})
+
+  def test_setter_generic_filters(self):
+    self.assertEquals(
+      DataType.setter_of(
+        AttributeOptions('Foo', 'bar', type = complex, delimiter = '/',
+          filter_1 = True, filter_3 = True))('X'), 'X/1//3/')
+
+  def test_setter_matches_process_value(self):
+    samples = [
+      (str, ('X', 1, u'Y')),
+      (bool, (True, 'false', 0, 'Something')),
+      (int, (1, 1L, 1.1, '1', True)),
+      (float, (1, 1.5, '1.5')),
+      (datetime.date, (datetime.date(2000, 1, 1), '2000-01-01')),
+      (datetime.time, (datetime.time(10, 15), '10:15:20')),
+      (datetime.datetime, ('2015-12-01T10:15:20',)),
+      (ValidStruct, (None, {'foo': 'FOO'}, AnotherValidStruct(foo = 'FOO')))
+    ]
+    for attr_type, values in samples:
+      for required in (False, True):
+        opts = AttributeOptions('Foo', 'bar', type = attr_type,
+          required = required)
+        for value in values:
+          self.assertEquals(
+            outcome(DataType.setter_of(opts), value),
+            outcome(lambda x: DataType.process_value(opts, x), value))
+
 
 class ObjectTypeTests(unittest.TestCase):
 
@@ -221,6 +280,45 @@ class ObjectTypeTests(unittest.TestCase):
       pass
 
 
+class StringTypeTests(unittest.TestCase):
+
+  def setUp(self):
+    self.attr_opts = AttributeOptions(
+      'Foo', 'bar', type = str, required = True, pattern = '^ *[a-z]',
+        strip = True, cleanse = True, normalize = True)
+
+  def test_plain_filters(self):
+    self.assertEquals(DataType.filters_of(
+      AttributeOptions('Foo', 'bar', type = str)), [StringType.value_of])
+
+  def test_pipeline(self):
+    filters = DataType.filters_of(self.attr_opts)
+    self.assertEquals(len(filters), 1)
+    self.assertEquals(filters[0](u'  ab\x00c\u00a0 \u2019d\t', self.attr_opts),
+      u'abc \'d')
+    self.assertEquals(DataType.setter_of(self.attr_opts)(u' x  y '), u'x y')
+
+  def test_pipeline_errors(self):
+    setter = DataType.setter_of(self.attr_opts)
+    for value, error in ((None, MissingRequiredValueError),
+      ('', MissingRequiredValueError), ('1', PatternMismatchError)):
+      try:
+        setter(value)
+        self.assertFalse(True)
+      except error, e:
+        self.assertEquals(e.parameters['attribute'], 'Foo.bar')
+
+  def test_pattern_cache(self):
+    pattern = StringType.pattern_of(self.attr_opts)
+    self.assertTrue(pattern is StringType.pattern_of(self.attr_opts))
+    self.assertEquals(StringType.match('abc', self.attr_opts), 'abc')
+    self.attr_opts.pattern = '^b'
+    self.attr_opts.touch()
+    self.assertFalse(pattern is StringType.pattern_of(self.attr_opts))
+    self.assertRaises(PatternMismatchError,
+      StringType.match, 'abc', self.attr_opts)
+
+
 class BooleanTypeTests(unittest.TestCase):
 
   def setUp(self):
@@ -290,3 +388,101 @@ class FloatTypeTests(NumericTypeTests):
 
   def test_required(self):
     self.do_test_required()
+
+
+class TemporalTypeTests(unittest.TestCase):
+
+  def setter_of(self, attr_type, **attr_opts):
+    return DataType.setter_of(
+      AttributeOptions('Foo', 'bar', type = attr_type, **attr_opts))
+
+  def test_iso_date(self):
+    setter = self.setter_of(datetime.date)
+    self.assertEquals(setter('2000-01-02'), datetime.date(2000, 1, 2))
+    self.assertEquals(setter(u'2000-01-02'), datetime.date(2000, 1, 2))
+    self.assertEquals(setter(''), None)
+    self.assertEquals(setter('2000-1-2'), datetime.date(2000, 1, 2))
+    self.assertEquals(setter('2000-1-02'), datetime.date(2000, 1, 2))
+    for value in ('2000-01-02T00:00:00', '2000/01/02', '+200-01-02'):
+      self.assertRaises(ValueError, setter, value)
+
+  def test_iso_time(self):
+    setter = self.setter_of(datetime.time)
+    self.assertEquals(setter('10:15:20'), datetime.time(10, 15, 20))
+    self.assertEquals(setter('10:15:20.5'), datetime.time(10, 15, 20, 500000))
+    self.assertEquals(setter('10:15:20Z').utcoffset(), datetime.timedelta(0))
+    self.assertEquals(setter('1:02:03'), datetime.time(1, 2, 3))
+    for value in ('10:15', '10:15:2x', '10:15:20.', '25:00:00',
+      '10:15:20-24'):
+      self.assertRaises(ValueError, setter, value)
+
+  def test_iso_datetime(self):
+    setter = self.setter_of(datetime.datetime)
+    self.assertEquals(setter('2015-12-01T10:15:20'),
+      datetime.datetime(2015, 12, 1, 10, 15, 20))
+    self.assertEquals(setter('2015-12-01T10:15:20,1234567'),
+      datetime.datetime(2015, 12, 1, 10, 15, 20, 123456))
+    value = setter('2015-12-01T10:15:20.123-05:30')
+    self.assertEquals(value.microsecond, 123000)
+    self.assertEquals(value.utcoffset(), -datetime.timedelta(hours = 5,
+      minutes = 30))
+    self.assertEquals(value.isoformat(), '2015-12-01T10:15:20.123000-05:30')
+    self.assertEquals(setter('2015-12-01T10:15:20+02').tzinfo,
+      FixedOffset.of(120))
+    self.assertEquals(setter('2015-12-01T10:15:20Z'),
+      setter('2015-12-01T12:15:20+0200'))
+    self.assertEquals(pickle.loads(pickle.dumps(value)), value)
+    self.assertEquals(setter('2015-12-1T1:02:03'),
+      datetime.datetime(2015, 12, 1, 1, 2, 3))
+    self.assertEquals(DateTimeType.value_of(u'2020-1-5T1:02:03',
+      AttributeOptions('Foo', 'bar', type = datetime.datetime)),
+        datetime.datetime(2020, 1, 5, 1, 2, 3))
+    for value in ('2015-12-01 10:15:20', '2015-12-01T10:15:20+1',
+      '2015-12-01T10:15:20Zx', '2015-13-01T10:15:20',
+      '2015-12-01T10:15:20+99:00', '2015-12-01T10:15:20+24:00',
+      '2015-12-01T10:15:20+01:99', '2015-12-01T10:15:20+0199'):
+      self.assertRaises(ValueError, setter, value)
+
+  def test_custom_format(self):
+    setter = self.setter_of(datetime.datetime, format = '%d/%m/%Y %H:%M')
+    self.assertEquals(setter('01/12/2015 10:15'),
+      datetime.datetime(2015, 12, 1, 10, 15))
+    self.assertRaises(ValueError, setter, '2015-12-01T10:15:00')
+    setter = self.setter_of(datetime.date, format = '%d/%m/%Y')
+    self.assertEquals(setter('02/01/2000'), datetime.date(2000, 1, 2))
+
+
+class DeferredListTests(unittest.TestCase):
+
+  def setUp(self):
+    self.attr_opts = AttributeOptions('Foo', 'bar', type = list,
+      item_type = int, lazy = True, max_length = 4)
+
+  def test_deferred(self):
+    value = ListType.value_of(['1', '2', 'x'], self.attr_opts)
+    self.assertTrue(isinstance(value, DeferredList))
+    self.assertEquals(len(value), 3)
+    self.assertEquals(value[1], 2)
+    self.assertEquals(list.__getitem__(value, 0), '1')
+    self.assertEquals(value[-2], 2)
+    value[2] = '3'
+    self.assertEquals(list.__getitem__(value, 2), 3)
+    self.assertEquals(list(value), [1, 2, 3])
+    self.assertTrue(value.__class__ is CustomList)
+
+  def test_coerce(self):
+    value = ListType.value_of(['1', 'x'], self.attr_opts)
+    self.assertRaises(ValueError, value.coerce)
+    self.assertEquals(list.__getitem__(value, 0), '1')
+    value = ListType.value_of(['1', '2'], self.attr_opts)
+    value.append('3')
+    self.assertEquals(value, [1, 2, 3])
+    self.assertTrue(value.__class__ is CustomList)
+    self.assertTrue(value.coerce() is value)
+
+  def test_length(self):
+    self.assertRaises(ListBoundaryViolationError,
+      ListType.value_of, range(5), self.attr_opts)
+    value = ListType.value_of(['1'] * 4, self.attr_opts)
+    self.assertRaises(ListBoundaryViolationError, value.append, 1)
+    self.assertTrue(value.__class__ is DeferredList)
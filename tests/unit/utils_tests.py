@@ -51,3 +51,14 @@ class UtilsTest(unittest.TestCase):
     self.assertTrue(is_numeric(0.0))
     self.assertFalse(is_numeric('0'))
     self.assertFalse(is_numeric([]))
+
+  def test_cleanse_str(self):
+    self.assertEquals(
+      cleanse_str(u'a\x00b\tc\u200bd\xade\r\n'), u'ab cde  ')
+    self.assertEquals(cleanse_str('abc'), u'abc')
+
+  def test_normalize_str(self):
+    self.assertEquals(
+      normalize_str(u' \u201cit\u2019s\u201d \u2014\xa0ok\u2026 '),
+        u'"it\'s" - ok...')
+    self.assertEquals(normalize_str(' a \t b '), u'a b')